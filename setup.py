@@ -13,12 +13,12 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/kspar/easy-thonny",
-    packages=setuptools.find_namespace_packages(),
+    packages=setuptools.find_namespace_packages(include=["thonnycontrib", "thonnycontrib.*"]),
     install_requires=[
         'easy-py>=0.7.2',
         'thonny>=4.1.4',
         'pillow>=8.0',
-        'chevron>=0.13.1',
+        'chevron>=0.14.0',
         'requests>=2.27.1'
     ],
     package_data={
@@ -29,5 +29,5 @@ setuptools.setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires='>=3.7',
+    python_requires='>=3.9',
 )
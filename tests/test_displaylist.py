@@ -0,0 +1,128 @@
+import json
+
+from thonnycontrib.easy.displaylist import (parse_html, DisplayList, DisplayListBuilder, TEXT, IMAGE, WINDOW, MARK,
+                                            NBSP, VERTICAL_SPACER, get_section_start_mark, get_section_end_mark)
+
+OBJECT = "￼"
+CODE_LINE = '<b>def</b> <i>f</i>(<u>x</u>): <b>return</b> x * <i>2</i>  <a href="/x">f</a>\n'
+
+
+def text_of(display_list):
+    """Text as the widget would show it, with a placeholder for each image or window"""
+    return "".join(item[1] if item[0] == TEXT else OBJECT for item in display_list.items if item[0] != MARK)
+
+
+def test_whitespace_is_collapsed_outside_pre():
+    assert text_of(parse_html("<p>a  \n b</p>")) == "\na b\n" + VERTICAL_SPACER
+
+
+def test_whitespace_is_kept_in_pre_except_leading_newline():
+    assert text_of(parse_html("<pre>\nx  y\n z</pre>")) == "\nx  y\n z\n" + VERTICAL_SPACER
+
+
+def test_space_between_inline_elements_is_kept_once():
+    items = parse_html("<b>x </b> <i>y</i>").items
+
+    assert items == [[TEXT, "x", ("_base_", "strong")], [TEXT, " ", ("_base_",)], [TEXT, "y", ("_base_", "em")]]
+
+
+def test_strip_chars_before_removes_trailing_chars_across_items():
+    builder = DisplayListBuilder()
+    builder._append_chars("a \n", ("x",))
+    builder._append_chars(" \n", ("y",))
+
+    assert builder._strip_chars_before(" \n") == {"x", "y"}
+    assert builder.display_list.items == [[TEXT, "a", ("x",)]]
+    assert builder._newline_count == 0
+    assert builder._strip_chars_before(" \n") is None
+
+
+def test_block_dividers_dont_repeat_linebreaks():
+    text = text_of(parse_html("<h1>T</h1><div>a</div><p>b</p><p>c</p>"))
+
+    assert text == "\nT\na\n" + VERTICAL_SPACER + "b\n" + VERTICAL_SPACER + "c\n" + VERTICAL_SPACER
+
+
+def test_newline_count_follows_the_items():
+    builder = DisplayListBuilder()
+    builder.feed("<h1>T</h1><p>a<br>b</p><pre>x\ny</pre><div> </div>")
+    builder.close()
+
+    assert builder._newline_count == text_of(builder.display_list).count("\n")
+
+
+def test_nested_lists_get_markers_by_depth():
+    text = text_of(parse_html("<ul><li>a<ul><li>b</li></ul></li><li>c</li></ul>"
+                              "<ol><li>x</li><li>y<ol><li>z</li></ol></li></ol>"))
+    lines = [line for line in text.split("\n") if line.strip(NBSP)]
+
+    assert lines == ["-" + NBSP + "a", ">" + NBSP + "b", "-" + NBSP + "c",
+                     "1." + NBSP + "x", "2." + NBSP + "y", "a." + NBSP + "z"]
+
+
+def test_list_items_are_tagged_with_their_level():
+    items = parse_html("<ul><li>a<ul><li>b</li></ul></li></ul>").items
+    tags = {item[1][-1]: item[2] for item in items if item[0] == TEXT and item[1].strip()}
+
+    assert "list1" in tags["a"] and "list2" in tags["b"]
+
+
+def test_data_load_section_is_between_its_marks():
+    display_list = parse_html('<p>x</p><div id="s" data-load="/s"><div>w</div></div><p>y</p>')
+    kinds = [item[1] if item[0] == MARK else item[0] for item in display_list.items]
+    start, end = kinds.index(get_section_start_mark("s")), kinds.index(get_section_end_mark("s"))
+
+    assert display_list.deferred_sections == [("s", "/s")]
+    assert [item[1] for item in display_list.items[start + 1:end]] == ["\n", "w"]
+    assert "y" in [item[1] for item in display_list.items[end:]]
+
+
+def test_image_goes_before_the_block_divider():
+    items = parse_html('<p>a<img src="i.png" width="10px" height="5%"> b</p>').items
+    images = [item for item in items if item[0] == IMAGE]
+
+    assert images == [[IMAGE, "i.png", ("_base_", "img", "p"), 10, None]]
+    assert items[items.index(images[0]) + 1] == [TEXT, "\n", ()]
+
+
+def test_form_controls_become_windows_and_inputs():
+    display_list = parse_html('<form action="/f"><input type="hidden" name="h" value="1"/>'
+                              '<input type="submit" name="s" value="Go"/></form>')
+    windows = [item for item in display_list.items if item[0] == WINDOW]
+
+    assert [window[1]["type"] for window in windows] == ["submit"]
+    assert windows[0][1]["form"] == 0
+    assert display_list.forms[0]["action"] == "/f"
+    assert [value for _, value in display_list.forms[0]["inputs"]] == ["1", "Go"]
+
+
+def test_display_list_survives_json_round_trip():
+    display_list = parse_html('<h1>T</h1><ul><li><a href="/x">x</a></li></ul><img src="i.png" width="10">'
+                              '<div id="s" data-load="/s">...</div>'
+                              '<form action="/f"><input type="submit" value="Go"/></form>')
+
+    restored = DisplayList.from_dict(json.loads(json.dumps(display_list.to_dict())))
+
+    assert restored.items == display_list.items
+    assert restored.forms == display_list.forms
+    assert restored.deferred_sections == display_list.deferred_sections
+
+
+def test_effective_tags_are_computed_once_per_context(monkeypatch):
+    computed = []
+    compute = DisplayListBuilder._compute_effective_tags
+    monkeypatch.setattr(DisplayListBuilder, "_compute_effective_tags",
+                        lambda self, *args: computed.append(args) or compute(self, *args))
+
+    display_list = parse_html("<pre><code>" + CODE_LINE * 300 + "</code></pre>")
+
+    text_runs = [item for item in display_list.items if item[0] == TEXT]
+    assert len(text_runs) > 2000
+    assert len(computed) == len(set(computed)) < 10
+
+
+def test_equal_tag_sets_share_one_tuple():
+    display_list = parse_html("<p><b>a</b> <i>b</i></p>" * 100 + "<pre>" + CODE_LINE * 100 + "</pre>")
+
+    tag_tuples = [item[2] for item in display_list.items if item[0] == TEXT]
+    assert len({id(tags) for tags in tag_tuples}) == len(set(tag_tuples))
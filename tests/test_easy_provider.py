@@ -0,0 +1,223 @@
+import collections
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from thonnycontrib.easy import easy_provider
+from thonnycontrib.easy.easy_provider import EasyExerciseProvider
+from thonnycontrib.easy.ui import FormData, EDITOR_CONTENT_NAME
+
+COURSE_ID = "1"
+EXERCISE_ID = "2"
+COURSE_LIST_URL = "/student/courses"
+EXERCISE_LIST_URL = f"/student/courses/{COURSE_ID}/exercises/"
+EXERCISE_URL = f"/student/courses/{COURSE_ID}/exercises/{EXERCISE_ID}"
+
+
+class CountingApi:
+    """Answers every endpoint with a canned response and counts the calls"""
+
+    def __init__(self, calls: collections.Counter, responses: dict):
+        self._calls = calls
+        self._responses = responses
+
+    def __getattr__(self, endpoint):
+        def call(*args):
+            self._calls[endpoint] += 1
+            return self._responses.get(endpoint)
+
+        return call
+
+
+class FakeEz:
+    def __init__(self):
+        self.calls = collections.Counter()
+        responses = {
+            "get_courses": SimpleNamespace(courses=[{"id": COURSE_ID, "title": "Programmeerimine", "alias": None}]),
+            "get_course_basic_info": SimpleNamespace(title="Programmeerimine", alias=None),
+            "get_course_exercises": SimpleNamespace(
+                exercises=[{"id": EXERCISE_ID, "effective_title": "Tere", "status": "UNSTARTED"}]),
+            "get_exercise_details": SimpleNamespace(effective_title="Tere", text_html="<p>Kirjuta programm</p>",
+                                                    is_open=True),
+            "get_all_submissions": SimpleNamespace(
+                submissions=[{"solution": "print('Tere')", "autograde_status": "COMPLETED",
+                              "grade": {"grade": 100, "is_autograde": False}}]),
+            "get_all_exercise_teacher_activities": SimpleNamespace(teacher_activities=[]),
+        }
+        self.student = CountingApi(self.calls, responses)
+        self.common = CountingApi(self.calls, responses)
+        self.util = SimpleNamespace(idp_client_name="test", get_stored_token=lambda token_type: None)
+
+    def is_auth_required(self):
+        return False
+
+
+class StubView:
+    def __init__(self):
+        self.reload_urls = []
+
+    def request_reload(self, url=None):
+        self.reload_urls.append(url)
+
+    def clear_page_cache(self):
+        pass
+
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    conf_path = tmp_path / "lahendus.ini"
+    conf_path.write_text("[DEFAULT]\nlang = et\n")
+    monkeypatch.setattr(easy_provider, "conf_file_path", str(conf_path))
+    monkeypatch.setattr(easy_provider, "update_check_file_path", str(tmp_path / "update_check.json"))
+    monkeypatch.setattr(easy_provider, "image_cache_dir_path", str(tmp_path / "image_cache"))
+    monkeypatch.setattr(easy_provider, "offline_store_path", str(tmp_path / "offline.sqlite3"))
+    monkeypatch.setattr(easy_provider.UpdateChecker, "is_update_required", lambda self: False)
+    monkeypatch.setattr(easy_provider, "_get_easy", lambda lang: FakeEz())
+    return EasyExerciseProvider(StubView())
+
+
+def test_exercise_page_calls_each_endpoint_once(provider):
+    html, breadcrumbs = provider.get_html_and_breadcrumbs(EXERCISE_URL, FormData())
+
+    assert "Kirjuta programm" in html
+    assert breadcrumbs[1] == (EXERCISE_LIST_URL, "Programmeerimine")
+    assert provider.easy.calls == {"get_exercise_details": 1, "get_all_submissions": 1,
+                                   "get_all_exercise_teacher_activities": 1, "get_courses": 1}
+
+
+def test_teacher_activities_are_not_fetched_without_submissions(provider):
+    provider.easy.student._responses["get_all_submissions"] = SimpleNamespace(submissions=[])
+    html, _ = provider.get_html_and_breadcrumbs(EXERCISE_URL, FormData())
+
+    assert "Kirjuta programm" in html
+    assert provider.easy.calls == {"get_exercise_details": 1, "get_all_submissions": 1, "get_courses": 1}
+
+
+def test_exercise_page_is_answered_from_cache(provider):
+    provider.get_html_and_breadcrumbs(EXERCISE_URL, FormData())
+    provider.get_html_and_breadcrumbs(EXERCISE_URL, FormData())
+
+    assert provider.easy.calls == {"get_exercise_details": 1, "get_all_submissions": 1,
+                                   "get_all_exercise_teacher_activities": 1, "get_courses": 1}
+
+
+def test_exercise_list_calls_each_endpoint_once(provider):
+    html, breadcrumbs = provider.get_html_and_breadcrumbs(EXERCISE_LIST_URL, FormData())
+
+    assert "Tere" in html
+    assert breadcrumbs[1] == (EXERCISE_LIST_URL, "Programmeerimine")
+    assert provider.easy.calls == {"get_course_exercises": 1, "get_courses": 1}
+
+
+def test_course_list_calls_each_endpoint_once(provider):
+    html, _ = provider.get_html_and_breadcrumbs(COURSE_LIST_URL, FormData())
+
+    assert "Programmeerimine" in html
+    assert provider.easy.calls == {"get_courses": 1}
+
+
+def test_course_title_comes_from_course_list(provider):
+    provider.get_html_and_breadcrumbs(COURSE_LIST_URL, FormData())
+    provider.get_html_and_breadcrumbs(EXERCISE_LIST_URL, FormData())
+    provider.get_html_and_breadcrumbs(EXERCISE_URL, FormData())
+
+    assert provider.easy.calls == {"get_courses": 1, "get_course_exercises": 1, "get_exercise_details": 1,
+                                   "get_all_submissions": 1, "get_all_exercise_teacher_activities": 1}
+
+
+def test_prefetched_exercise_page_is_not_fetched_again(provider):
+    provider.prefetch(EXERCISE_URL)
+    provider.get_html_and_breadcrumbs(EXERCISE_URL, FormData())
+
+    assert provider.easy.calls == {"get_exercise_details": 1, "get_all_submissions": 1,
+                                   "get_all_exercise_teacher_activities": 1, "get_courses": 1}
+
+
+def test_submission_refetches_only_changed_resources(provider):
+    provider.get_html_and_breadcrumbs(EXERCISE_URL, FormData())
+    html, _ = provider.get_html_and_breadcrumbs(EXERCISE_URL + "/submissions",
+                                                FormData([(EDITOR_CONTENT_NAME, "print(1)")]))
+
+    assert "Kirjuta programm" in html
+    assert provider.easy.calls == {"get_exercise_details": 1, "get_all_submissions": 2,
+                                   "get_all_exercise_teacher_activities": 2, "get_courses": 1,
+                                   "post_submission": 1}
+
+
+def test_course_list_aliases_map_to_its_breadcrumb(provider):
+    _, breadcrumbs = provider.get_html_and_breadcrumbs("/", FormData())
+
+    assert provider.get_canonical_url("/") == breadcrumbs[-1][0]
+    assert provider.get_canonical_url(COURSE_LIST_URL) == breadcrumbs[-1][0]
+    assert provider.get_canonical_url(EXERCISE_URL) == EXERCISE_URL
+
+
+def test_refresh_reloads_only_pages_using_the_response(provider, monkeypatch):
+    monkeypatch.setitem(easy_provider.CACHE_TTL_SECONDS, "get_all_submissions", 0)
+    provider.get_html_and_breadcrumbs(COURSE_LIST_URL, FormData())
+    provider.get_html_and_breadcrumbs(EXERCISE_URL, FormData())
+
+    # Stale, so it is refreshed in the background
+    provider.get_html_and_breadcrumbs(EXERCISE_URL, FormData())
+    deadline = time.time() + 5
+    while provider.easy.calls["get_all_submissions"] < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+    assert set(provider.exercises_view.reload_urls) == {EXERCISE_URL}
+
+
+def test_slow_call_is_not_repeated_while_in_flight(provider, monkeypatch):
+    monkeypatch.setattr(easy_provider, "OFFLINE_FALLBACK_SECONDS", 0.1)
+    provider._user_key = "user"
+    key = ("get_course_exercises", COURSE_ID)
+    provider.offline_store.put("user", key, {"type": "StudentExerciseResp", "fields": {"exercises": []}})
+    live = SimpleNamespace(exercises=[{"id": EXERCISE_ID}])
+
+    def get_course_exercises(course_id):
+        provider.easy.calls["get_course_exercises"] += 1
+        time.sleep(0.5)
+        return live
+
+    provider.easy.student.get_course_exercises = get_course_exercises
+
+    # Both get the stored response, as the call doesn't complete in time
+    assert provider.fetch(*key).exercises == []
+    assert provider.fetch(*key).exercises == []
+    assert provider.easy.calls["get_course_exercises"] == 1
+
+    # The late response is cached
+    time.sleep(0.6)
+    assert provider.response_cache.peek(key) is live
+
+
+def test_assessment_section_still_in_progress_offers_retry(provider):
+    provider.easy.student._responses["get_all_submissions"] = SimpleNamespace(
+        submissions=[{"solution": "print(1)", "autograde_status": "IN_PROGRESS", "grade": None}])
+
+    html = provider.get_section_html(EXERCISE_URL + "/assessment")
+
+    assert f'href="{EXERCISE_URL}"' in html
+    assert provider.easy.calls["await_latest_exercise_submission_details"] == easy_provider.AWAIT_ASSESSMENT_ATTEMPTS
+
+
+def test_assessment_section_gets_no_page_notices(provider, monkeypatch):
+    monkeypatch.setattr(easy_provider.UpdateChecker, "is_update_required", lambda self: True)
+
+    html = provider.get_section_html(EXERCISE_URL + "/assessment")
+
+    assert "Kehtiv hinne" in html
+    assert "<h1>" not in html
+
+
+def test_assessment_section_reports_errors_within_it(provider):
+    def fail(*args):
+        raise RuntimeError("server error")
+
+    provider.easy.student.await_latest_exercise_submission_details = fail
+
+    html = provider.get_section_html(EXERCISE_URL + "/assessment")
+
+    assert "server error" in html
+    assert "<h1>" not in html
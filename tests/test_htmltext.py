@@ -0,0 +1,50 @@
+import collections
+
+from thonnycontrib.easy.displaylist import parse_html, TEXT, MARK
+from thonnycontrib.easy.htmltext import HtmlRenderer
+
+# Highlighted code and prose, like long exercise pages, with a separately loaded section
+CODE_LINE = '<b>def</b> <i>f</i>(<u>x</u>): <b>return</b> x * <i>2</i>  <a href="/x">f</a>\n'
+PAGE = ("<h1>Ülesanne</h1>" + "<p>Koostada <code>programm</code>, mille <b>väljund</b> on <a href='/a'>see</a>.</p>" * 50
+        + "<pre><code>" + CODE_LINE * 300 + "</code></pre>"
+        + '<div id="feedback" data-load="/feedback"><p>⌛...</p></div>'
+        + "<ul>" + "<li>Punkt <b>üks</b> <i>ja</i> kaks</li>" * 50 + "</ul>")
+
+
+class RecordingText:
+    """Stands in for the Text widget and counts the calls, each of which would be a Tcl round-trip"""
+
+    def __init__(self):
+        self.calls = collections.Counter()
+        self.inserted = []
+
+    def __getattr__(self, name):
+        def call(*args):
+            self.calls[name] += 1
+            if name == "direct_insert_segments":
+                self.inserted.extend(args[1::2])
+
+        return call
+
+
+def test_rendering_doesnt_read_back_from_the_widget():
+    display_list = parse_html(PAGE)
+    widget = RecordingText()
+
+    HtmlRenderer(widget, None, None).render(display_list)
+
+    assert set(widget.calls) == {"direct_insert", "direct_insert_segments", "mark_set", "mark_gravity"}
+
+
+def test_text_runs_between_marks_are_inserted_with_one_call():
+    display_list = parse_html(PAGE)
+    widget = RecordingText()
+
+    HtmlRenderer(widget, None, None).render(display_list)
+
+    text_runs = [item[1] for item in display_list.items if item[0] == TEXT]
+    marks = sum(1 for item in display_list.items if item[0] == MARK)
+    assert len(widget.inserted) == len(text_runs)
+    assert widget.calls["direct_insert_segments"] == marks + 1
+    # Each run used to take at least an insert and a few reads
+    assert len(text_runs) >= 10 * sum(widget.calls.values())
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from thonnycontrib.easy import http_cache
+from thonnycontrib.easy.http_cache import DiskHttpCache
+
+BODY = b"x" * 1000
+
+
+@pytest.fixture
+def served(monkeypatch):
+    monkeypatch.setattr(http_cache.http_client, "get", lambda url, headers: (200, {"ETag": "1"}, BODY))
+
+
+def count_scans(cache, monkeypatch):
+    scans = []
+    scan = cache._scan
+    monkeypatch.setattr(cache, "_scan", lambda: scans.append(1) or scan())
+    return scans
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def test_directory_is_not_scanned_while_under_limit(tmp_path, served, monkeypatch):
+    cache = DiskHttpCache(str(tmp_path), max_bytes=100 * len(BODY))
+    scans = count_scans(cache, monkeypatch)
+
+    for i in range(50):
+        assert cache.get(f"https://example.com/{i}.png") == BODY
+
+    assert len(scans) == 1
+    assert cache._total_bytes == dir_size(tmp_path)
+
+
+def test_eviction_keeps_size_under_limit(tmp_path, served):
+    max_bytes = 20 * len(BODY)
+    cache = DiskHttpCache(str(tmp_path), max_bytes=max_bytes)
+
+    for i in range(100):
+        cache.get(f"https://example.com/{i}.png")
+
+    assert dir_size(tmp_path) <= max_bytes
+    assert cache._total_bytes == dir_size(tmp_path)
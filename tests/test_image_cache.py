@@ -0,0 +1,51 @@
+from thonnycontrib.easy.image_cache import ImageCache, BYTES_PER_PIXEL
+
+URL = "https://example.com/a.png"
+
+
+class FakeImage:
+    def __init__(self, width, height=10):
+        self._width = width
+        self._height = height
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+
+def test_pin_keeps_only_the_pinned_variant():
+    cache = ImageCache(max_bytes=300 * 10 * BYTES_PER_PIXEL)
+    cache.set_pinned("view", [(URL, 200)])
+    cache.put(URL, 100, FakeImage(100))
+    cache.put(URL, 200, FakeImage(200))
+
+    # Doesn't fit with both variants of URL
+    cache.put("https://example.com/b.png", 100, FakeImage(100))
+
+    assert cache.get(URL, 100) is None
+    assert cache.get(URL, 200) is not None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_replaced_pins_become_evictable():
+    cache = ImageCache(max_bytes=100 * 10 * BYTES_PER_PIXEL)
+    cache.set_pinned("view", [(URL, 100)])
+    cache.put(URL, 100, FakeImage(100))
+    cache.set_pinned("view", ())
+
+    cache.put("https://example.com/b.png", 100, FakeImage(100))
+
+    assert cache.get(URL, 100) is None
+
+
+def test_stats_count_hits_and_misses():
+    cache = ImageCache()
+    cache.put(URL, 100, FakeImage(100))
+    cache.get(URL, 100)
+    cache.get(URL, 200)
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["images"]) == (1, 1, 1)
+    assert stats["bytes"] == 100 * 10 * BYTES_PER_PIXEL
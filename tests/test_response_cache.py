@@ -0,0 +1,45 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from thonnycontrib.easy.response_cache import ResponseCache
+
+
+def test_concurrent_loads_are_merged():
+    cache = ResponseCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return "value"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(cache.get, "key", loader, 30) for _ in range(4)]
+        assert [f.result() for f in futures] == ["value"] * 4
+    assert len(calls) == 1
+
+
+def test_waiters_load_themselves_when_the_running_load_hangs():
+    cache = ResponseCache(max_wait=0.1)
+    release = threading.Event()
+    hung = threading.Thread(target=cache.get, args=("key", lambda: release.wait() and "old", 30))
+    hung.start()
+    time.sleep(0.05)
+
+    started = time.time()
+    assert cache.get("key", lambda: "new", 30) == "new"
+    assert time.time() - started < 1
+
+    release.set()
+    hung.join()
+
+
+def test_values_older_than_max_stale_are_reloaded_before_returning():
+    cache = ResponseCache()
+    cache.put("key", "old", ttl=0)
+
+    assert cache.get("key", lambda: "new", 0, max_stale=60) == "old"
+    time.sleep(0.1)
+    cache.put("key", "old", ttl=0)
+    assert cache.get("key", lambda: "new", 0, max_stale=0) == "new"
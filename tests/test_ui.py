@@ -0,0 +1,54 @@
+import time
+import tkinter as tk
+
+import pytest
+
+from thonnycontrib.easy.ui import ExercisesView, ExerciseProvider
+
+PAGE_HTML = '<h1>Tere</h1><p><a href="/next">Edasi</a></p><div id="feedback" data-load="/feedback"></div>'
+SECTION_HTML = "<p>Tagasiside</p>"
+
+
+class FakeProvider(ExerciseProvider):
+    def __init__(self, view):
+        pass
+
+    def get_html_and_breadcrumbs(self, url, form_data):
+        if url == "/feedback":
+            return SECTION_HTML, []
+        return PAGE_HTML, [("/", "Tere")]
+
+
+@pytest.fixture
+def root():
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        pytest.skip(f"Tk is not available: {e}")
+    yield root
+    root.destroy()
+
+
+def run_mainloop(root, seconds):
+    root.after(int(seconds * 1000), root.quit)
+    root.mainloop()
+
+
+def has_outstanding_work(view):
+    return (view._provider is None or view._page_future is not None or bool(view._section_futures)
+            or bool(view._image_futures))
+
+
+def test_nothing_is_scheduled_while_idle(root):
+    view = ExercisesView(root, FakeProvider)
+    view.pack(fill="both", expand=True)
+
+    deadline = time.time() + 10
+    while has_outstanding_work(view) and time.time() < deadline:
+        run_mainloop(root, 0.1)
+    assert not has_outstanding_work(view)
+    assert view._current_html == PAGE_HTML
+
+    # Let rendering and resize debouncing finish
+    run_mainloop(root, 1)
+    assert root.tk.splitlist(root.tk.call("after", "info")) == ()
@@ -0,0 +1,90 @@
+import threading
+import time
+import tkinter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from thonnycontrib.easy.ui_queue import UiQueue
+
+
+@pytest.fixture
+def tcl():
+    # Runs after jobs like Tk does, but doesn't need a display
+    return tkinter.Tcl()
+
+
+def run_until(tcl, condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        tcl.update()
+        time.sleep(0.01)
+    return condition()
+
+
+def scheduled_jobs(tcl):
+    return tcl.tk.splitlist(tcl.tk.call("after", "info"))
+
+
+def test_calls_from_workers_run_in_ui_thread(tcl):
+    polls = []
+    queue = UiQueue(tcl, lambda: polls.append(1), interval_ms=10)
+    threads = []
+
+    def work():
+        time.sleep(0.1)
+        queue.call_soon(lambda: threads.append(threading.current_thread()))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        queue.track(executor.submit(work))
+        assert run_until(tcl, lambda: not queue.is_polling())
+
+    assert threads == [threading.current_thread()]
+    assert polls
+    assert scheduled_jobs(tcl) == ()
+
+
+def test_nothing_is_scheduled_while_idle(tcl):
+    UiQueue(tcl, lambda: None, interval_ms=10).start()
+
+    # One poll, which finds nothing to wait for
+    assert run_until(tcl, lambda: scheduled_jobs(tcl) == ())
+    time.sleep(0.05)
+    tcl.update()
+    assert scheduled_jobs(tcl) == ()
+
+
+def test_polls_while_has_work_says_calls_may_come(tcl):
+    has_work = threading.Event()
+    has_work.set()
+    calls = []
+    queue = UiQueue(tcl, lambda: None, has_work.is_set, interval_ms=10)
+
+    def background_work():
+        time.sleep(0.2)
+        queue.call_soon(calls.append, "reload")
+        has_work.clear()
+
+    queue.start()
+    threading.Thread(target=background_work).start()
+
+    assert run_until(tcl, lambda: calls == ["reload"] and not queue.is_polling())
+    assert scheduled_jobs(tcl) == ()
+
+
+def test_failing_call_doesnt_stop_polling(tcl):
+    calls = []
+    queue = UiQueue(tcl, lambda: None, interval_ms=10)
+    queue.call_soon(lambda: 1 / 0)
+    queue.call_soon(calls.append, "next")
+    queue.start()
+
+    assert run_until(tcl, lambda: calls == ["next"] and not queue.is_polling())
+
+
+def test_close_cancels_polling(tcl):
+    queue = UiQueue(tcl, lambda: None, lambda: True, interval_ms=10)
+    queue.start()
+    queue.close()
+
+    assert scheduled_jobs(tcl) == ()
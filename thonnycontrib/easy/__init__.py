@@ -1,30 +1,40 @@
+import os
+
 from thonny import get_workbench, THONNY_USER_DIR
 
 from thonnycontrib.easy.ui import ExercisesView
 
 
+def _create_easy_provider(exercises_view):
+    # Imports Ez, requests and chevron, so it runs in a worker thread when the view is first shown
+    from thonnycontrib.easy.easy_provider import EasyExerciseProvider
+    return EasyExerciseProvider(exercises_view)
+
+
+def _create_demo_provider(exercises_view):
+    from thonnycontrib.easy.demo_exercise_provider import DemoExerciseProvider
+    return DemoExerciseProvider(exercises_view)
+
+
 class EasyExercisesView(ExercisesView):
     def __init__(self, master):
-        from thonnycontrib.easy.easy_provider import EasyExerciseProvider
-        super(EasyExercisesView, self).__init__(master, EasyExerciseProvider)
+        snapshot_path = os.path.join(THONNY_USER_DIR, "lahendus", "last_page.json")
+        super(EasyExercisesView, self).__init__(master, _create_easy_provider, snapshot_path)
 
 
 class DemoExercisesView(ExercisesView):
     def __init__(self, master):
-        from thonnycontrib.easy.demo_exercise_provider import DemoExerciseProvider
-        super(DemoExercisesView, self).__init__(master, DemoExerciseProvider)
+        super(DemoExercisesView, self).__init__(master, _create_demo_provider)
 
 
 def load_plugin():
     import logging
     import platform
-    import datetime
     import configparser
-    import os
+    from thonnycontrib.easy.logs import configure_logging
 
     path = os.path.join(THONNY_USER_DIR, "lahendus")
     os.makedirs(path, exist_ok=True)
-    log_file = os.path.join(path, datetime.datetime.now().strftime("%Y-%m-%d") + ".lahendus.log")
 
     # config
     config = configparser.ConfigParser()
@@ -35,12 +45,9 @@ def load_plugin():
         with open(config_location, 'w') as configfile:
             config.write(configfile)
 
-    file_handler = logging.FileHandler(log_file, encoding="UTF-8", mode="a")
-    file_handler.setFormatter(logging.Formatter("%(asctime)s;%(levelname)s;%(message)s"))
-
     logger = logging.getLogger(__name__)
     logger.setLevel(logging.DEBUG)
-    logger.addHandler(file_handler)
+    configure_logging(logger, path)
     logger.info(f"Starting plug-in on '{platform.platform()}'")
 
     # get_workbench().add_view(DemoExercisesView, "DemoEx", "ne")
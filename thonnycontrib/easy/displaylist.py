@@ -0,0 +1,470 @@
+"""
+Turns HTML into a display list, which HtmlRenderer applies to a Text widget.
+
+This stage doesn't touch Tk, so it can run in a worker thread.
+"""
+from html.parser import HTMLParser
+from typing import List, Tuple, Optional
+
+NBSP = "\u00A0"
+VERTICAL_SPACER = NBSP + "\n"
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
+             "link", "meta", "param", "command", "keygen", "source"}
+
+# Display list item kinds. Items are lists, so that display lists can be stored as JSON.
+TEXT = "text"  # [TEXT, chars, tags]
+IMAGE = "image"  # [IMAGE, url, tags, declared width, declared height], sizes in pixels or None
+WINDOW = "window"  # [WINDOW, widget spec, tags]
+MARK = "mark"  # [MARK, mark name, gravity]
+
+
+def get_ul_li_marker(depth):
+    """
+    Previous: UL_LI_MARKER = "•" + NBSP
+    """
+    options = ["-", ">", "*"]
+    return options[depth % len(options)] + NBSP
+
+
+def get_ol_li_marker(depth, order):
+    return (str(order) if depth % 2 == 0 else chr(96 + order)) + "." + NBSP
+
+
+def get_section_start_mark(section_id):
+    return "section_start_" + section_id
+
+
+def get_section_end_mark(section_id):
+    return "section_end_" + section_id
+
+
+def is_link_tag(tag):
+    return ":" in tag or "/" in tag or "!" in tag
+
+
+def parse_pixel_size(value) -> Optional[int]:
+    """Width or height attribute as pixels. Percentages and other units are ignored"""
+    if value is None:
+        return None
+    value = value.strip()
+    if value.endswith("px"):
+        value = value[:-2].rstrip()
+    if not value.isdigit() or int(value) == 0:
+        return None
+    return int(value)
+
+
+class DisplayList:
+    def __init__(self):
+        self.items = []  # type: List[list]
+        # Form attributes plus "inputs": [attrs, value] pairs. Window specs refer to forms by index.
+        self.forms = []  # type: List[dict]
+        # Elements with id and data-load attributes get their content loaded separately from data-load url
+        self.deferred_sections = []  # type: List[Tuple[str, str]]
+
+    def get_image_urls(self) -> List[str]:
+        return [item[1] for item in self.items if item[0] == IMAGE]
+
+    def to_dict(self) -> dict:
+        return {"items": self.items, "forms": self.forms, "deferred_sections": self.deferred_sections}
+
+    @staticmethod
+    def from_dict(data: dict) -> "DisplayList":
+        """Inverse of to_dict after a round trip through JSON, which turns tuples into lists"""
+        display_list = DisplayList()
+        for item in data["items"]:
+            if item[0] != MARK:
+                item[2] = tuple(item[2])
+            display_list.items.append(item)
+        display_list.forms = data["forms"]
+        display_list.deferred_sections = [tuple(section) for section in data["deferred_sections"]]
+        return display_list
+
+
+def parse_html(html: str) -> DisplayList:
+    builder = DisplayListBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.display_list
+
+
+class DisplayListBuilder(HTMLParser):
+    """
+    Keeps the same whitespace and block layout rules as rendering directly into a Text widget would,
+    but works on the items built so far.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.display_list = DisplayList()
+        self._items = self.display_list.items
+        # Shadow of the text built so far, so that layout decisions don't need to scan the items
+        self._newline_count = 0
+
+        # Tag context is a stack. Each level carries the sorted tag tuple of the context up to that level,
+        # so popping needs no work and pushing an already seen combination is a dict lookup.
+        # Tuples are interned, so that equal runs share the same tuple.
+        self._context_tags = []
+        self._context_tag_tuples = []
+        self._void_tags_in_context = 0
+        self._pushed_tag_tuples = {}
+        self._effective_tag_tuples = {}
+        self._interned_tags = {}
+        self._add_tag("_base_")
+        self._active_lists = []
+        self._is_active_table = False  # Need to center text later, keep track
+        self._active_ol_item_counts = []
+        self._active_forms = []
+        self._block_tags = ["div", "p", "ul", "ol", "li", "pre", "form", "h1", "h2", "summary", "details", "hr",
+                            "table", "tr", "img"]
+        self._alternatives = {"b": "strong", "i": "em", "th": "td"}
+        self._simple_tags = ["strong", "u", "em"]
+        self._ignored_tags = []
+        self._active_attrs_by_tag = {}  # assuming proper close tags
+        self._open_sections = []  # [tag, section id, nesting depth]
+
+    def handle_starttag(self, tag, attrs):
+        self._close_void_tags()
+        tag = self._normalize_tag(tag)
+        attrs = dict(attrs)
+        if tag in self._ignored_tags:
+            return
+        else:
+            self._active_attrs_by_tag[tag] = attrs
+
+        if tag in self._block_tags:
+            self._add_block_divider(tag)
+
+        self._add_tag(tag)
+
+        if tag not in VOID_TAGS:
+            for section in self._open_sections:
+                if section[0] == tag:
+                    section[2] += 1
+
+            if "id" in attrs and "data-load" in attrs:
+                self._open_section(tag, attrs["id"], attrs["data-load"])
+
+        if tag == "a" and "href" in attrs:
+            self._add_tag(attrs["href"])
+        elif tag == "ul":
+            self._active_lists.append("ul")
+        elif tag == "ol":
+            self._active_lists.append("ol")
+            self._active_ol_item_counts.append(0)
+        elif tag == "br":
+            self._append_text(NBSP + "\n")
+        elif tag == "li":
+            if self._active_lists[-1] == "ul":
+                # Set correct li symbol based on the level. Correct for Python indexing
+                self._append_text(get_ul_li_marker(max(0, self._active_lists.count("ul") - 1)))
+            elif self._active_lists[-1] == "ol":
+                self._active_ol_item_counts[-1] += 1
+                # Set correct li symbol based on the level. Correct for Python indexing
+                self._append_text(get_ol_li_marker(self._active_lists.count("ol") - 1, self._active_ol_item_counts[-1]))
+        elif tag == "img":
+            if "src" in attrs:
+                self._append_object(IMAGE, attrs["src"], parse_pixel_size(attrs.get("width")),
+                                    parse_pixel_size(attrs.get("height")))
+        elif tag == "form":
+            form = attrs.copy()
+            form["inputs"] = []
+            self._active_forms.append(form)
+            self.display_list.forms.append(form)
+        elif tag == "input":
+            if not attrs.get("type"):
+                attrs["type"] = "text"
+
+            if attrs["type"] == "hidden":
+                self._add_hidden_form_variable(attrs)
+            elif attrs["type"] == "file":
+                # TODO: support also "multiple" flag
+                self._append_object(WINDOW, {"type": "file", "attrs": attrs})
+            elif attrs["type"] == "submit":
+                self._append_submit_button(attrs)
+        elif tag == "hr":
+            self._append_text("─" * 40)
+        elif tag == "td":  # Need to center text later, keep track
+            self._is_active_table = True
+
+    def handle_endtag(self, tag):
+        tag = self._normalize_tag(tag)
+        if tag in self._ignored_tags:
+            return
+        else:
+            self._active_attrs_by_tag[tag] = {}
+
+        if tag == "ul":
+            self._close_active_list("ul")
+        elif tag == "ol":
+            self._close_active_list("ol")
+            self._active_ol_item_counts.pop()
+        elif tag == "form":
+            self._active_forms.pop()
+        elif tag == "td":  # Need to center text later, keep track
+            self._is_active_table = False
+
+        self._pop_tag(tag)
+
+        # prepare for next piece of text
+        if tag in self._block_tags:
+            self._add_block_divider(tag)
+
+        for section in self._open_sections[:]:
+            if section[0] == tag:
+                section[2] -= 1
+                if section[2] == 0:
+                    self._close_section(section)
+
+    def handle_data(self, data):
+        self._close_void_tags()
+        # TODO: Not sure if centering of the table content should be done here. Probably should be done here.
+        if self._is_active_table:  # If is table column, center text
+            self._append_text(self._prepare_text(data).center(20, NBSP))
+        else:
+            self._append_text(self._prepare_text(data))
+
+    def _open_section(self, tag, section_id, url):
+        # Left gravity keeps the marks in place when content is inserted at their position
+        self._items.append([MARK, get_section_start_mark(section_id), "left"])
+        self._open_sections.append([tag, section_id, 1])
+        self.display_list.deferred_sections.append((section_id, url))
+
+    def _close_section(self, section):
+        self._open_sections.remove(section)
+        self._items.append([MARK, get_section_end_mark(section[1]), "left"])
+
+    def _close_void_tags(self):
+        if self._void_tags_in_context:
+            tags = [tag for tag in self._context_tags if tag not in VOID_TAGS]
+            self._context_tags = []
+            self._context_tag_tuples = []
+            self._void_tags_in_context = 0
+            for tag in tags:
+                self._add_tag(tag)
+
+    def _normalize_tag(self, tag):
+        return self._alternatives.get(tag, tag)
+
+    def _add_tag(self, tag):
+        parent_tags = self._context_tag_tuples[-1] if self._context_tag_tuples else ()
+        key = (parent_tags, tag)
+        tags = self._pushed_tag_tuples.get(key)
+        if tags is None:
+            tags = self._pushed_tag_tuples[key] = self._intern_tags(set(parent_tags) | {tag})
+
+        self._context_tags.append(tag)
+        self._context_tag_tuples.append(tags)
+        if tag in VOID_TAGS:
+            self._void_tags_in_context += 1
+
+    def _pop_context_tag(self):
+        self._context_tag_tuples.pop()
+        if self._context_tags.pop() in VOID_TAGS:
+            self._void_tags_in_context -= 1
+
+    def _add_block_divider(self, tag):
+        if tag == "p" and self._context_tags and (self._context_tags[-1] in ["li", "td", "th"]):
+            return
+
+        # replace all trailing whitespace with a single linebreak
+        self._strip_chars_before("\r\n\t ")
+
+        self._append_chars("\n", self._intern_tags(tag for tag in self._get_tags_before() if tag in self._block_tags))
+
+        # For certain tags add vertical spacer (if it's not there already)
+        if (tag in ("p", "ul", "ol", "summary", "details", "pre", "img")
+                and self._get_text_before(2) != VERTICAL_SPACER
+                and not self._is_last_char_on_first_line()):
+            self._append_chars(VERTICAL_SPACER, ())
+
+        # For table, always add vertical spacer.
+        if tag == "table":
+            self._append_chars(VERTICAL_SPACER, ())
+
+    def _pop_tag(self, tag):
+        if tag in VOID_TAGS:
+            self._close_void_tags()
+            return
+
+        while self._context_tags and self._context_tags[-1] != tag:
+            # remove unclosed or synthetic other tags
+            self._pop_context_tag()
+
+        if self._context_tags:
+            assert self._context_tags[-1] == tag
+            self._pop_context_tag()
+
+    def _close_active_list(self, tag):
+        # TODO: active list may also include list item marker
+        while self._active_lists and self._active_lists[-1] != tag:
+            # remove unclosed or synthetic other tags
+            self._active_lists.pop()
+
+        if self._active_lists:
+            assert self._active_lists[-1] == tag
+            self._active_lists.pop()
+
+    def _prepare_text(self, text):
+        text = text.replace("\r\n", "\n")
+        # Note that <code> is inline
+        if "pre" not in self._context_tags:
+            text = text.replace("\n", " ")
+            while "  " in text:
+                text = text.replace("  ", " ")
+
+        # Remove single leading newline in <pre>
+        # see https://html.spec.whatwg.org/multipage/syntax.html#element-restrictions
+        if self._context_tags and self._context_tags[-1] == "pre" and text.startswith("\n"):
+            text = text[1:]
+
+        return text
+
+    def _append_text(self, chars, extra_tags=()):
+        # don't put two horizontal whitespaces next to each other unless it is pre
+        if self._context_tags and "pre" in self._context_tags:
+            pass
+        else:
+            trailing_tags = self._strip_chars_before(" \t")
+            trailing_space = trailing_tags is not None
+
+            if self._get_char_before() in ["\n", NBSP]:
+                # don't keep space in the beginning of the line
+                trailing_space = False
+
+            if (trailing_space and not chars.startswith(" ")
+                    and not chars.startswith("\t")):
+                # Restore the required space
+                self._append_chars(" ", self._intern_tags(trailing_tags))
+
+        self._append_chars(chars, self._get_effective_tags(extra_tags))
+
+    def _append_submit_button(self, attrs):
+        form = self._active_forms[-1]
+        value = attrs.get("value", "Submit")
+        self._append_object(WINDOW, {"type": "submit", "attrs": attrs, "value": value,
+                                     "form": self.display_list.forms.index(form)})
+        if "name" in attrs:
+            form["inputs"].append([attrs, value])
+
+    def _add_hidden_form_variable(self, attrs):
+        self._active_forms[-1]["inputs"].append([attrs, attrs.get("value")])
+
+    def _get_effective_tags(self, extra_tags):
+        context_tags = self._context_tag_tuples[-1] if self._context_tag_tuples else ()
+        list_level = min(len(self._active_lists), 5)
+        if extra_tags:
+            return self._compute_effective_tags(context_tags, list_level, extra_tags)
+
+        key = (context_tags, list_level)
+        tags = self._effective_tag_tuples.get(key)
+        if tags is None:
+            tags = self._effective_tag_tuples[key] = self._compute_effective_tags(context_tags, list_level, ())
+        return tags
+
+    def _compute_effective_tags(self, context_tags, list_level, extra_tags):
+        tags = set(extra_tags) | set(context_tags)
+
+        if list_level:
+            tags.add("list%d" % list_level)
+
+        return self._intern_tags(tags)
+
+    def _intern_tags(self, tags):
+        tags = tuple(sorted(tags))
+        return self._interned_tags.setdefault(tags, tags)
+
+    # Operations on the items built so far. Images and windows take one position like a character,
+    # but have no text. Marks take no position.
+
+    def _append_chars(self, chars, tags):
+        if not chars:
+            return
+
+        if self._items and self._items[-1][0] == TEXT and self._items[-1][2] == tags:
+            self._items[-1][1] += chars
+        else:
+            self._items.append([TEXT, chars, tags])
+        self._newline_count += chars.count("\n")
+
+    def _append_object(self, kind, value, *extra):
+        # Objects go before the last character, which is usually the linebreak of a block divider
+        item = [kind, value, self._get_effective_tags(()), *extra]
+        i = self._get_last_position_index()
+        if i < 0:
+            self._items.append(item)
+            return
+
+        last = self._items[i]
+        if last[0] == TEXT and len(last[1]) > 1:
+            self._items[i:i + 1] = [[TEXT, last[1][:-1], last[2]], item, [TEXT, last[1][-1], last[2]]]
+        else:
+            self._items.insert(i, item)
+
+    def _get_last_position_index(self):
+        for i in range(len(self._items) - 1, -1, -1):
+            if self._items[i][0] != MARK:
+                return i
+        return -1
+
+    def _get_char_before(self):
+        i = self._get_last_position_index()
+        if i < 0:
+            # The document ends with a linebreak
+            return "\n"
+
+        item = self._items[i]
+        return item[1][-1] if item[0] == TEXT else ""
+
+    def _get_tags_before(self):
+        i = self._get_last_position_index()
+        return () if i < 0 else self._items[i][2]
+
+    def _get_text_before(self, count):
+        result = ""
+        for item in reversed(self._items):
+            if count <= 0:
+                break
+
+            if item[0] == TEXT:
+                part = item[1][-count:]
+                result = part + result
+                count -= len(part)
+            elif item[0] != MARK:
+                count -= 1
+
+        return result
+
+    def _strip_chars_before(self, chars):
+        """
+        Removes trailing characters, which belong to chars.
+        Returns the union of their tags or None, if there was nothing to remove.
+        """
+        removed_tags = None
+        while True:
+            i = self._get_last_position_index()
+            if i < 0 or self._items[i][0] != TEXT:
+                break
+
+            item = self._items[i]
+            stripped = item[1].rstrip(chars)
+            if len(stripped) == len(item[1]):
+                break
+
+            if removed_tags is None:
+                removed_tags = set()
+            removed_tags.update(item[2])
+            self._newline_count -= item[1].count("\n", len(stripped))
+
+            if stripped:
+                item[1] = stripped
+                break
+            else:
+                del self._items[i]
+
+        return removed_tags
+
+    def _is_last_char_on_first_line(self):
+        i = self._get_last_position_index()
+        last_is_newline = i >= 0 and self._items[i][0] == TEXT and self._items[i][1].endswith("\n")
+        return self._newline_count - last_is_newline == 0
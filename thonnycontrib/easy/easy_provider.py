@@ -1,18 +1,27 @@
+import concurrent.futures
 import configparser
 import logging
 import re
-import time
-from typing import Tuple, List, Union, Callable
+import threading
+from collections import OrderedDict
+from typing import Tuple, List, Union, Callable, Optional, Dict
 
-import pkg_resources
-import requests
-from easy import Ez, AuthRequiredException, decode_token, ErrorResponseException
+import easy.data
+from easy import Ez, AuthRequiredException, decode_token, ErrorResponseException, TokenType
+from requests import RequestException
 from thonny import THONNY_USER_DIR
 
+from .http_cache import DiskHttpCache
+from .logs import describe_form_data
+from .offline_store import OfflineStore
+from .response_cache import ResponseCache
 from .templates_generator import *
+from .update_check import UpdateChecker
 from .ui import ExerciseProvider, FormData, EDITOR_CONTENT_NAME
 
 AUTH_TIMEOUT_SECONDS = 300
+AWAIT_ASSESSMENT_ATTEMPTS = 3
+PREFETCH_UNFINISHED_EXERCISES = 3
 ROOT_PATH = "/"
 HOME = [(ROOT_PATH, "Lahendus")]
 LOGOUT_PATH = "/logout"
@@ -20,14 +29,47 @@ AUTH_PATH = "/auth"
 LANG_PATH = "/lang"
 
 conf_file_path = os.path.join(os.path.join(THONNY_USER_DIR, "lahendus"), "lahendus.ini")
+update_check_file_path = os.path.join(os.path.join(THONNY_USER_DIR, "lahendus"), "update_check.json")
+image_cache_dir_path = os.path.join(os.path.join(THONNY_USER_DIR, "lahendus"), "image_cache")
+offline_store_path = os.path.join(os.path.join(THONNY_USER_DIR, "lahendus"), "offline.sqlite3")
 
 EXERCISE_LIST_RE = re.compile(r"^/student/courses/([0-9]+)/exercises/$")
 EXERCISE_DESCRIPTION_RE = re.compile(r"^/student/courses/([0-9]+)/exercises/([0-9]+)$")
 COURSE_LIST_RE = re.compile(r"^/student/courses$")
 SUBMIT_SOLUTION_RE = re.compile(r"^/student/courses/([0-9]+)/exercises/([0-9]+)/submissions$")
+ASSESSMENT_RE = re.compile(r"^/student/courses/([0-9]+)/exercises/([0-9]+)/assessment$")
 
 PRODUCTION = True
 
+# How long a cached API response is considered fresh. Stale responses are shown immediately and refreshed
+# in the background.
+CACHE_TTL_SECONDS = {
+    "get_courses": 10 * 60,
+    "get_course_basic_info": 60 * 60,
+    "get_course_exercises": 60,
+    "get_exercise_details": 10 * 60,
+    "get_all_submissions": 30,
+    "get_all_exercise_teacher_activities": 60,
+}
+# How long past its TTL a cached response may still be shown while it is refreshed. Older responses are reloaded
+# before showing the page, so that a submission or grade from yesterday doesn't look current.
+CACHE_MAX_STALE_SECONDS = {
+    "get_courses": 24 * 60 * 60,
+    "get_course_basic_info": 24 * 60 * 60,
+    "get_course_exercises": 10 * 60,
+    "get_exercise_details": 24 * 60 * 60,
+    "get_all_submissions": 5 * 60,
+    "get_all_exercise_teacher_activities": 5 * 60,
+}
+COMMON_ENDPOINTS = {"get_course_basic_info"}
+# Pages whose cache keys are remembered for reloading them when one of the responses is refreshed
+MAX_PAGES_WITH_KEYS = 32
+
+# When a response has been stored for offline use, the server gets this long to answer before the stored one is used
+OFFLINE_FALLBACK_SECONDS = 5
+# Calls which may outlive their caller run in their own workers, so that hung calls can't take over the fetch executor
+MAX_LIVE_CALLS = 4
+
 logger = logging.getLogger(__name__)
 
 
@@ -49,6 +91,55 @@ def _get_easy(lang):
                   auth_browser_fail_msg=auth_browser_fail_msg)
 
 
+class SlowResponseError(IOError):
+    pass
+
+
+def _is_network_error(e: Exception) -> bool:
+    """Whether the error means that the server can't be reached right now, rather than a problem with the request"""
+    if isinstance(e, (RequestException, SlowResponseError)):
+        return True
+    return (isinstance(e, ErrorResponseException) and getattr(e.resp, "status_code", None) is not None
+            and e.resp.status_code >= 500)
+
+
+def _response_to_json(resp) -> dict:
+    # Ez responses are dataclasses with JSON values, apart from the raw response
+    return {"type": type(resp).__name__,
+            "fields": {name: value for name, value in vars(resp).items() if name not in ("resp_code", "response")}}
+
+
+def _response_from_json(data: dict):
+    return getattr(easy.data, data["type"])(resp_code=200, response=None, **data["fields"])
+
+
+class _PageBuild:
+    """What building one page has used so far"""
+
+    def __init__(self):
+        self.keys = set()
+        # Time of the oldest stored response used instead of a live one
+        self.stored_at = None  # type: Optional[float]
+        # Keys refreshed in the background while the page was being built
+        self.refreshed = set()
+
+
+class ExercisePageBundle:
+    """
+    Everything needed for building one exercise page. Each resource is fetched exactly once per page build.
+    """
+
+    def __init__(self, course_id: str, exercise_id: str, course_title: str, details, submissions: list,
+                 teacher_activities: Optional[list], provider_url: str):
+        self.course_id = course_id
+        self.exercise_id = exercise_id
+        self.course_title = course_title
+        self.details = details
+        self.submissions = submissions
+        self.teacher_activities = teacher_activities
+        self.provider_url = provider_url
+
+
 # noinspection DuplicatedCode
 class EasyExerciseProvider(ExerciseProvider):
     def __init__(self, exercises_view):
@@ -65,16 +156,77 @@ class EasyExerciseProvider(ExerciseProvider):
 
         self.exercises_view = exercises_view
         self.easy = _get_easy(lang)
-        self.last_update_check = None
+        self.response_cache = ResponseCache()
+        self._course_index = {}  # course id -> course from the course list response
+        self._fetch_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4,
+                                                                     thread_name_prefix="lahendus-fetch")
+        self.update_checker = UpdateChecker(update_check_file_path, exercises_view.request_reload)
+        self.image_cache = DiskHttpCache(image_cache_dir_path)
+        self.offline_store = OfflineStore(offline_store_path)
+        self._live_executor = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_LIVE_CALLS,
+                                                                    thread_name_prefix="lahendus-live")
+        # key -> (future, cache version before the call) of calls in flight and the calls their callers gave up on
+        self._live_calls = {}  # type: Dict[tuple, Tuple[concurrent.futures.Future, Tuple[int, int]]]
+        self._late_live_calls = set()
+        self._live_calls_lock = threading.Lock()
+        self._user_key = None  # type: Optional[str]
+        # Page being built in the current thread, if any
+        self._build = threading.local()
+        # Cache keys of recently built pages by page url and the builds in progress
+        self._page_keys = OrderedDict()  # type: OrderedDict[str, frozenset]
+        self._running_builds = set()
+        self._page_keys_lock = threading.Lock()
         self.config = config
         self.lang = lang
 
     def get_html_and_breadcrumbs(self, url: str, form_data: FormData) -> Tuple[str, List[Tuple[str, str]]]:
-        logger.info(f"User query: '{url}'. Form data: '{form_data}'.")
+        build = _PageBuild()
+        with self._page_keys_lock:
+            self._running_builds.add(build)
+        self._build.current = build
+        page_url = None
+        try:
+            html, breadcrumbs = self._get_html_and_breadcrumbs(url, form_data)
+            # Last breadcrumb points to the page itself
+            page_url = breadcrumbs[-1][0] if breadcrumbs else None
+        finally:
+            self._build.current = None
+            self._finish_build(build, page_url)
+
+        if build.stored_at is not None:
+            html = generate_offline_html(build.stored_at, self.lang) + html
+        return html, breadcrumbs
+
+    def _finish_build(self, build: _PageBuild, page_url: Optional[str]) -> None:
+        with self._page_keys_lock:
+            self._running_builds.discard(build)
+            if page_url is not None:
+                self._page_keys[page_url] = frozenset(build.keys)
+                self._page_keys.move_to_end(page_url)
+                while len(self._page_keys) > MAX_PAGES_WITH_KEYS:
+                    self._page_keys.popitem(last=False)
+
+        if page_url is not None and build.keys & build.refreshed:
+            # The page may have been built with the old response
+            logger.info(f"Responses for '{page_url}' were refreshed while building it, reloading it.")
+            self.exercises_view.request_reload(page_url)
+
+    def _request_reload_for(self, key) -> None:
+        """Reloads the current page if it was built with the response for key"""
+        with self._page_keys_lock:
+            for build in self._running_builds:
+                build.refreshed.add(key)
+            urls = [url for url, keys in self._page_keys.items() if key in keys]
+
+        for url in urls:
+            self.exercises_view.request_reload(url)
+
+    def _get_html_and_breadcrumbs(self, url: str, form_data: FormData) -> Tuple[str, List[Tuple[str, str]]]:
+        # Queries are logged by log_match once the action is known
         try:
-            if self._update_required():
-                logger.info(f"Plug-in update required from user: {self._get_versions()}")
-                return generate_update_html(self._get_versions(), self.lang), HOME
+            if self.update_checker.is_update_required():
+                logger.info(f"Plug-in update required from user: {self.update_checker.get_versions()}")
+                return generate_update_html(self.update_checker.get_versions(), self.lang), HOME
 
             if url == AUTH_PATH:
                 if self.easy.is_auth_required():
@@ -89,6 +241,10 @@ class EasyExerciseProvider(ExerciseProvider):
                         given_name, family_name = info['given_name'], info['family_name']
 
                         logger.info("Authenticated!")
+                        self.response_cache.clear()
+                        self._course_index = {}
+                        self._user_key = None
+                        self.exercises_view.clear_page_cache()
                         logger.info(f"Check-in. User: '{username}'. Name: {given_name} {family_name}. Email: {email}.")
                         self.easy.check_in()
 
@@ -117,6 +273,7 @@ class EasyExerciseProvider(ExerciseProvider):
 
             elif url == LANG_PATH:
                 self.lang = "en" if self.lang == "et" else "et"
+                self.exercises_view.clear_page_cache()
 
                 self.config.set('DEFAULT', 'lang', self.lang)
                 with open(conf_file_path, 'w') as configfile:
@@ -151,9 +308,240 @@ class EasyExerciseProvider(ExerciseProvider):
 
             return generate_error_html(e), [self._breadcrumb_courses()]
 
+    def get_section_html(self, url: str) -> str:
+        """
+        Sections are parts of a page, so they don't get the update, login or offline notices of pages
+        and errors are reported within the section.
+        """
+        match = ASSESSMENT_RE.fullmatch(url)
+        if match is None:
+            self.log_match("Unknown section", url, FormData())
+            return generate_section_error_html(url, self.lang)
+
+        self.log_match("ASSESSMENT", url, FormData())
+        course_id, exercise_id = match.group(1), match.group(2)
+        try:
+            return self._get_assessment_html(course_id, exercise_id)
+        except AuthRequiredException:
+            return generate_section_login_html(f"/student/courses/{course_id}/exercises/{exercise_id}", self.lang)
+        except Exception as e:
+            logger.exception(e, stacklevel=True, exc_info=True)
+            return generate_section_error_html(e, self.lang)
+
+    def fetch(self, endpoint: str, *args: str):
+        """
+        Calls the given Ez endpoint (e.g. 'get_exercise_details') through the response cache.
+
+        Responses are also stored for offline use. When the server can't be reached or is slow, the stored
+        response is returned instead.
+        """
+        api = self.easy.common if endpoint in COMMON_ENDPOINTS else self.easy.student
+        method = getattr(api, endpoint)
+        key = (endpoint,) + args
+        build = getattr(self._build, "current", None)
+        if build is not None:
+            build.keys.add(key)
+        try:
+            return self.response_cache.get(key, lambda: self._load_live(key, method, args),
+                                           CACHE_TTL_SECONDS[endpoint], self._on_cache_refresh,
+                                           CACHE_MAX_STALE_SECONDS[endpoint])
+        except Exception as e:
+            user = self._get_user_key()
+            stored = self.offline_store.get(user, key) if user is not None and _is_network_error(e) else None
+            if stored is None:
+                raise
+
+            logger.info(f"Using stored {key} from {stored[1]}: {e!r}")
+            self._note_offline_use(stored[1])
+            return _response_from_json(stored[0])
+
+    def _load_live(self, key, method, args):
+        user = self._get_user_key()
+        if user is None or not self.offline_store.contains(user, key):
+            value = method(*args)
+        else:
+            live_future = self._start_live_call(user, key, method, args)
+            try:
+                value = live_future.result(OFFLINE_FALLBACK_SECONDS)
+            except concurrent.futures.TimeoutError:
+                with self._live_calls_lock:
+                    is_late = not live_future.done()
+                    if is_late:
+                        self._late_live_calls.add(live_future)
+                if is_late:
+                    raise SlowResponseError(f"No response for {key} in {OFFLINE_FALLBACK_SECONDS} seconds")
+                value = live_future.result()
+
+        if user is not None:
+            self.offline_store.put(user, key, _response_to_json(value))
+        return value
+
+    def _start_live_call(self, user, key, method, args) -> concurrent.futures.Future:
+        """Returns the future of the call for key, which is started only if it's not in flight already"""
+        with self._live_calls_lock:
+            if key in self._live_calls:
+                return self._live_calls[key][0]
+
+            # A late response must not replace data which has been invalidated meanwhile, e.g. by a submission
+            version = self.response_cache.get_version(key)
+            live_future = self._live_executor.submit(method, *args)
+            self._live_calls[key] = (live_future, version)
+
+        # Outside the lock, as it runs at once if the call has completed already
+        live_future.add_done_callback(lambda f: self._on_live_call_done(user, key, version, f))
+        return live_future
+
+    def _on_live_call_done(self, user, key, version, future):
+        with self._live_calls_lock:
+            if self._live_calls.get(key, (None,))[0] is future:
+                del self._live_calls[key]
+            is_late = future in self._late_live_calls
+
+        if is_late:
+            try:
+                self._on_late_response(user, key, version, future)
+            finally:
+                # Counts as background work until the page is reloaded
+                with self._live_calls_lock:
+                    self._late_live_calls.discard(future)
+
+    def _on_late_response(self, user, key, version, future):
+        if future.exception() is not None or self._get_user_key() != user:
+            return
+
+        if not self.response_cache.put(key, future.result(), CACHE_TTL_SECONDS[key[0]], version):
+            logger.info(f"Ignoring late response for invalidated {key}.")
+            return
+
+        logger.info(f"Late response for {key}, reloading the pages using it.")
+        self.offline_store.put(user, key, _response_to_json(future.result()))
+        self._request_reload_for(key)
+
+    def _get_user_key(self) -> Optional[str]:
+        """Subject of the stored access token, which doesn't need to be valid. None when logged out"""
+        if self._user_key is None:
+            try:
+                token = self.easy.util.get_stored_token(TokenType.ACCESS)
+                if token is not None:
+                    self._user_key = decode_token(token.token)["sub"]
+            except Exception as e:
+                logger.warning(f"Could not read user from access token: {e!r}")
+        return self._user_key
+
+    def _note_offline_use(self, stored_at: float) -> None:
+        build = getattr(self._build, "current", None)
+        if build is not None and (build.stored_at is None or stored_at < build.stored_at):
+            build.stored_at = stored_at
+
+    def _fetch_in_worker(self, *call: str):
+        """Runs in the fetch executor. Returns the result with what fetching it used"""
+        build = _PageBuild()
+        self._build.current = build
+        try:
+            return self.fetch(*call), build
+        finally:
+            self._build.current = None
+
+    def fetch_concurrently(self, *calls: Tuple[str, ...]) -> list:
+        """
+        Fetches independent (endpoint, *args) calls in parallel and returns their results in the same order.
+
+        Waits for all calls to complete. If any of them failed, AuthRequiredException takes precedence over
+        other errors, so that the login page is shown just like with sequential calls.
+        """
+        return self._collect_fetches(self._start_fetches(*calls))
+
+    def _start_fetches(self, *calls: Tuple[str, ...]) -> List[concurrent.futures.Future]:
+        return [self._fetch_executor.submit(self._fetch_in_worker, *call) for call in calls]
+
+    def _collect_fetches(self, futures: List[concurrent.futures.Future]) -> list:
+        """Waits for fetches started by _start_fetches and returns their results as fetch_concurrently does"""
+        concurrent.futures.wait(futures)
+
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        for e in errors:
+            if isinstance(e, AuthRequiredException):
+                raise e
+        if errors:
+            raise errors[0]
+
+        results = []
+        build = getattr(self._build, "current", None)
+        for f in futures:
+            value, worker_build = f.result()
+            # Workers record their use in their own thread
+            if build is not None:
+                build.keys |= worker_build.keys
+            if worker_build.stored_at is not None:
+                self._note_offline_use(worker_build.stored_at)
+            results.append(value)
+        return results
+
+    def get_image(self, url) -> bytes:
+        return self.image_cache.get(url)
+
+    def prefetch(self, url: str) -> None:
+        """
+        Warms up the response cache for the page at url. Makes one request at a time and leaves the fetch
+        executor to page loads.
+        """
+        if self.easy.is_auth_required():
+            return
+
+        try:
+            match = EXERCISE_DESCRIPTION_RE.fullmatch(url)
+            if match:
+                course_id, exercise_id = match.group(1), match.group(2)
+                self.fetch("get_exercise_details", course_id, exercise_id)
+                if self.fetch("get_all_submissions", course_id, exercise_id).submissions:
+                    self.fetch("get_all_exercise_teacher_activities", course_id, exercise_id)
+                return
+
+            match = EXERCISE_LIST_RE.fullmatch(url)
+            if match:
+                self.fetch("get_course_exercises", match.group(1))
+        except Exception as e:
+            logger.info(f"Prefetching '{url}' failed: {e!r}")
+
+    def get_prefetch_urls(self, url: str) -> List[str]:
+        """First unfinished exercises of an exercise list, which is already in the response cache"""
+        match = EXERCISE_LIST_RE.fullmatch(url)
+        if not match:
+            return []
+
+        course_id = match.group(1)
+        resp = self.response_cache.peek(("get_course_exercises", course_id))
+        if resp is None:
+            return []
+
+        unfinished = [e for e in resp.exercises if e.get("status") != "COMPLETED"]
+        return [f"/student/courses/{course_id}/exercises/{e['id']}" for e in unfinished[:PREFETCH_UNFINISHED_EXERCISES]]
+
+    def has_background_work(self) -> bool:
+        with self._live_calls_lock:
+            waiting_late_calls = bool(self._late_live_calls)
+        return waiting_late_calls or self.response_cache.is_refreshing() or self.update_checker.is_checking()
+
+    def get_canonical_url(self, url: str) -> str:
+        if url == ROOT_PATH or COURSE_LIST_RE.fullmatch(url):
+            return self._breadcrumb_courses()[0]
+        return url
+
+    def _on_cache_refresh(self, key):
+        logger.info(f"Refreshed cached response {key}, reloading the pages using it.")
+        self._request_reload_for(key)
+
     def _logout(self):
+        user = self._get_user_key()
+        if user is not None:
+            self.offline_store.remove_user(user)
+        self._user_key = None
+
         self.easy.logout_in_browser()
         self.easy.shutdown()
+        self.response_cache.clear()
+        self._course_index = {}
+        self.exercises_view.clear_page_cache()
         self.easy = _get_easy(self.lang)
 
     def _authenticate(self):
@@ -165,7 +553,7 @@ class EasyExerciseProvider(ExerciseProvider):
         return self._submit_solution(course_id, ex_id, form_data)
 
     def _show_course_list(self):
-        courses = self.easy.student.get_courses().courses
+        courses = self._get_courses()
         return generate_course_list_html(courses, self.lang), [self._breadcrumb_courses()]
 
     def _show_exercise_description(self, match):
@@ -177,28 +565,112 @@ class EasyExerciseProvider(ExerciseProvider):
         return self._get_ex_list(course_id)
 
     def _get_course_list(self):
-        return generate_course_list_html(self.easy.student.get_courses().courses, self.lang), [
+        return generate_course_list_html(self._get_courses(), self.lang), [
             self._breadcrumb_courses()]
 
     def _get_ex_list(self, course_id: str):
-        exercises = self.easy.student.get_course_exercises(course_id).exercises
+        exercises = self._fetch_with_course_list(course_id, ("get_course_exercises", course_id))[0].exercises
         breadcrumb_ex_list = self._breadcrumb_exercises(course_id)
         html = generate_exercise_list_html(breadcrumb_ex_list[0], exercises, self.lang)
         return html, [self._breadcrumb_courses(), breadcrumb_ex_list]
 
     def _get_ex_description(self, course_id: str, exercise_id: str):
-        details = self.easy.student.get_exercise_details(course_id, exercise_id)
-        breadcrumb_this = (f"/student/courses/{course_id}/exercises/{exercise_id}", details.effective_title)
-        breadcrumbs = [self._breadcrumb_courses(), self._breadcrumb_exercises(course_id), breadcrumb_this]
-        return generate_exercise_html(self, course_id, exercise_id, self.lang), breadcrumbs
+        bundle = self._get_exercise_page_bundle(course_id, exercise_id)
+        breadcrumb_this = (f"/student/courses/{course_id}/exercises/{exercise_id}", bundle.details.effective_title)
+        breadcrumbs = [self._breadcrumb_courses(), self._breadcrumb_exercises(course_id, bundle.course_title),
+                       breadcrumb_this]
+        return generate_exercise_html(bundle, self.lang), breadcrumbs
+
+    def _get_exercise_page_bundle(self, course_id: str, exercise_id: str) -> "ExercisePageBundle":
+        details_call = ("get_exercise_details", course_id, exercise_id)
+        submissions_call = ("get_all_submissions", course_id, exercise_id)
+        activities_call = ("get_all_exercise_teacher_activities", course_id, exercise_id)
+
+        calls = [details_call, submissions_call]
+        if course_id not in self._course_index:
+            calls.append(("get_courses",))
+        futures = self._start_fetches(*calls)
+
+        # Teacher activities are shown only with submissions, so they are fetched once submissions are known.
+        # The other calls keep running meanwhile.
+        submissions_future = futures[1]
+        concurrent.futures.wait([submissions_future])
+        if submissions_future.exception() is None and submissions_future.result()[0].submissions:
+            calls.append(activities_call)
+            futures += self._start_fetches(activities_call)
+
+        results = dict(zip(calls, self._collect_fetches(futures)))
+        if ("get_courses",) in results:
+            self._course_index = {str(c["id"]): c for c in results[("get_courses",)].courses}
+
+        details = results[details_call]
+        submissions = results[submissions_call].submissions
+        activities = results[activities_call].teacher_activities if activities_call in results else None
+
+        return ExercisePageBundle(course_id, exercise_id, self._get_course_title(course_id), details, submissions,
+                                  activities, self.easy.util.idp_client_name)
+
+    def _get_assessment_html(self, course_id: str, exercise_id: str) -> str:
+        """
+        Feedback section of the exercise page, which is loaded separately after a submission.
+        """
+        for _ in range(AWAIT_ASSESSMENT_ATTEMPTS):
+            # Wait for AT assessment finish
+            self.easy.student.await_latest_exercise_submission_details(course_id, exercise_id)
+            self.response_cache.invalidate(("get_all_submissions", course_id, exercise_id),
+                                           ("get_all_exercise_teacher_activities", course_id, exercise_id))
+            bundle = self._get_exercise_page_bundle(course_id, exercise_id)
+            if not is_assessment_in_progress(bundle):
+                return generate_feedback_html(bundle, self.lang)
+
+        # Opening the page again loads the section again
+        logger.info(f"Assessment of exercise {exercise_id} still in progress after {AWAIT_ASSESSMENT_ATTEMPTS} waits")
+        return generate_feedback_html(bundle, self.lang, f"/student/courses/{course_id}/exercises/{exercise_id}")
 
     def _submit_solution(self, course_id: str, exercise_id: str, form_data):
         self.easy.student.post_submission(course_id, exercise_id, form_data.get(EDITOR_CONTENT_NAME))
+        self.response_cache.invalidate(("get_all_submissions", course_id, exercise_id),
+                                       ("get_all_exercise_teacher_activities", course_id, exercise_id),
+                                       ("get_course_exercises", course_id))
         return self._get_ex_description(course_id, exercise_id)
 
-    def _breadcrumb_exercises(self, course_id: str) -> Tuple[str, str]:
-        basic_info = self.easy.common.get_course_basic_info(course_id)
-        return f"/student/courses/{course_id}/exercises/", basic_info.title if basic_info.alias is None else basic_info.alias
+    def _get_courses(self) -> list:
+        courses = self.fetch("get_courses").courses
+        self._course_index = {str(c["id"]): c for c in courses}
+        return courses
+
+    def _fetch_with_course_list(self, course_id: str, *calls: Tuple[str, ...]) -> list:
+        """
+        Like fetch_concurrently, but also fetches the course list when the course is not in the index yet
+        (e.g. when the first page shown is an exercise), so that its title doesn't need another round-trip.
+        """
+        if course_id in self._course_index:
+            return self.fetch_concurrently(*calls)
+
+        *results, courses_resp = self.fetch_concurrently(*calls, ("get_courses",))
+        self._course_index = {str(c["id"]): c for c in courses_resp.courses}
+        return results
+
+    def _get_course_title(self, course_id: str) -> str:
+        """
+        Answers from the course index, which is filled from the course list response.
+        """
+        course = self._course_index.get(course_id)
+        if course is None:
+            # Refresh the index lazily, e.g. when the first page shown is not the course list
+            self._get_courses()
+            course = self._course_index.get(course_id)
+
+        if course is None:
+            basic_info = self.fetch("get_course_basic_info", course_id)
+            return basic_info.title if basic_info.alias is None else basic_info.alias
+
+        return course["title"] if course.get("alias") is None else course["alias"]
+
+    def _breadcrumb_exercises(self, course_id: str, course_title: Optional[str] = None) -> Tuple[str, str]:
+        if course_title is None:
+            course_title = self._get_course_title(course_id)
+        return f"/student/courses/{course_id}/exercises/", course_title
 
     def _breadcrumb_courses(self) -> Tuple[str, str]:
         return f"/student/courses/", "Kursused" if self.lang == "et" else "Courses"
@@ -209,47 +681,6 @@ class EasyExerciseProvider(ExerciseProvider):
         lang_title = "Eesti keeles" if self.lang == "en" else "In English"
         return [(log_in_title, AUTH_PATH) if self.easy.is_auth_required() else (log_out_title, LOGOUT_PATH), (lang_title, LANG_PATH)]
 
-    @staticmethod
-    def _get_versions():
-        logger.info("Getting the installed plugin-in version info via pkg_resources...")
-        installed_version = pkg_resources.require("thonny-lahendus")[0].version
-
-        logger.info("Getting the latest plugin-in version info via pypi...")
-        resp: requests.Response = requests.get("https://pypi.org/pypi/thonny-lahendus/json")
-        latest_version = resp.json()["info"]["version"]
-
-        versions = {"current": installed_version, "latest": latest_version}
-        logger.info(f"Plug-in version info: {versions}")
-        return versions
-
-    def _update_required(self):
-        def minutes_passed(oldepoch, minutes: int):
-            if oldepoch is None:
-                return True
-            return time.time() - oldepoch >= 60 * minutes
-
-        check_every = 10
-        check_required = minutes_passed(self.last_update_check, check_every)
-
-        if not check_required:
-            logger.info(f"Skipping plug-in update check as {check_every} minutes are not passed from the last check.")
-            return False
-
-        logger.info("Checking for plug-in update...")
-        versions = self._get_versions()
-        major_installed, minor_installed, patch_installed = tuple(map(int, versions["current"].split(".")))
-        major_latest, minor_latest, patch_latest = tuple(map(int, versions["latest"].split(".")))
-
-        update_required = major_installed < major_latest
-        if not update_required:
-            logger.info(f"Version '{major_installed}' < '{major_latest}' is {update_required}, no update required.")
-        else:
-            logger.info(f"Version '{major_installed}' < '{major_latest}' is {update_required}, update required.")
-
-        self.last_update_check = time.time()
-
-        return update_required
-
     @staticmethod
     def log_match(matched_action: str, url: str, form_data: FormData):
-        logger.info(f"User query: '{url}'. Form data: '{form_data}'. ---> {matched_action}")
+        logger.info(f"User query: '{url}'. Form data: '{describe_form_data(form_data)}'. ---> {matched_action}")
@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Tuple, Optional
+
+from .displaylist import DisplayList
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_PAGES_BYTES = 8 * 1024 * 1024
+
+
+class CachedPage:
+    def __init__(self, url: str, html: str, breadcrumbs: List[Tuple[str, str]], display_list: DisplayList):
+        self.url = url
+        self.html = html
+        self.breadcrumbs = breadcrumbs
+        self.display_list = display_list
+        # Rough estimate, html is kept for comparing with revalidated content
+        self.size = 2 * len(html) + sum(len(item[1]) for item in display_list.items
+                                        if isinstance(item[1], str)) + 100 * len(display_list.items)
+
+
+class PageCache:
+    """
+    Recently shown pages in parsed form, evicted in LRU order when their total size exceeds max_bytes.
+    Can be cleared from any thread.
+    """
+
+    def __init__(self, max_bytes: int = MAX_CACHED_PAGES_BYTES):
+        self._max_bytes = max_bytes
+        self._pages = OrderedDict()  # type: OrderedDict[str, CachedPage]
+        self._total_size = 0
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        with self._lock:
+            page = self._pages.get(url)
+            if page is not None:
+                self._pages.move_to_end(url)
+            return page
+
+    def put(self, page: CachedPage) -> None:
+        with self._lock:
+            self._remove(page.url)
+            if page.size > self._max_bytes:
+                return
+
+            self._pages[page.url] = page
+            self._total_size += page.size
+            while self._total_size > self._max_bytes:
+                _, evicted = self._pages.popitem(last=False)
+                self._total_size -= evicted.size
+
+    def remove(self, url: str) -> None:
+        with self._lock:
+            self._remove(url)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+            self._total_size = 0
+
+    def _remove(self, url):
+        page = self._pages.pop(url, None)
+        if page is not None:
+            self._total_size -= page.size
+
+
+def save_page_snapshot(path: str, page: CachedPage) -> None:
+    """Stores the page for showing it at once in the next session"""
+    data = {"url": page.url, "html": page.html, "breadcrumbs": page.breadcrumbs,
+            "display_list": page.display_list.to_dict()}
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="UTF-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"Could not save page snapshot: {e!r}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def load_page_snapshot(path: str) -> Optional[CachedPage]:
+    try:
+        with open(path, encoding="UTF-8") as f:
+            data = json.load(f)
+        return CachedPage(data["url"], data["html"], [tuple(crumb) for crumb in data["breadcrumbs"]],
+                          DisplayList.from_dict(data["display_list"]))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+        logger.warning(f"Ignoring unreadable page snapshot: {e!r}")
+        return None
+
+
+def remove_page_snapshot(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove page snapshot: {e!r}")
+
+
+class HistoryEntry:
+    def __init__(self, url: str):
+        self.url = url
+        self.yview = None  # type: Optional[Tuple[float, float]]
+
+
+class NavigationHistory:
+    """Back and forward navigation between visited urls"""
+
+    def __init__(self):
+        self._entries = []  # type: List[HistoryEntry]
+        self._index = -1
+
+    def visit(self, url: str) -> None:
+        """Adds a new entry after the current one and forgets the forward entries"""
+        del self._entries[self._index + 1:]
+        self._entries.append(HistoryEntry(url))
+        self._index = len(self._entries) - 1
+
+    def get_current(self) -> Optional[HistoryEntry]:
+        return self._entries[self._index] if self._entries else None
+
+    def set_current_url(self, url: str) -> None:
+        """
+        Records the canonical url of the page, which was loaded for the current entry. Then going back to it
+        won't repeat requests with side effects (e.g. submissions) and repeated visits don't pile up.
+        """
+        entry = self.get_current()
+        if entry is None:
+            return
+
+        entry.url = url
+        if self._index > 0 and self._entries[self._index - 1].url == url:
+            del self._entries[self._index]
+            self._index -= 1
+
+    def can_go_back(self) -> bool:
+        return self._index > 0
+
+    def can_go_forward(self) -> bool:
+        return self._index < len(self._entries) - 1
+
+    def back(self) -> HistoryEntry:
+        assert self.can_go_back()
+        self._index -= 1
+        return self._entries[self._index]
+
+    def forward(self) -> HistoryEntry:
+        assert self.can_go_forward()
+        self._index += 1
+        return self._entries[self._index]
+
+    def clear(self) -> None:
+        self._entries = []
+        self._index = -1
@@ -1,38 +1,41 @@
 import os.path
 import platform
+import time
 import tkinter as tk
 import tkinter.font as tkfont
-from html.parser import HTMLParser
 from tkinter import ttk
-from typing import List, Tuple, Any
+from typing import List, Tuple, Any, Optional, Callable
 
 from thonny import tktextext, ui_utils
 from thonny.codeview import get_syntax_options_for_tag
 
-NBSP = "\u00A0"
-VERTICAL_SPACER = NBSP + "\n"
-VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
-             "link", "meta", "param", "command", "keygen", "source"}
+from .displaylist import (DisplayList, parse_html, get_ul_li_marker, get_section_start_mark, get_section_end_mark,
+                          is_link_tag, NBSP, TEXT, IMAGE, WINDOW, MARK)
+from .images import DEFAULT_MAX_IMAGE_WIDTH
 
-_image_placeholder = None
+# Large documents are applied in slices, giving Tk a chance to process events in between
+RENDER_SLICE_ITEMS = 200
+RENDER_SLICE_SECONDS = 0.02
 
+# Images are requested when they come within this many lines (or a screenful, if more) of the visible area
+MIN_LAZY_IMAGE_MARGIN_LINES = 10
 
-def get_ul_li_marker(depth):
-    """
-    Previous: UL_LI_MARKER = "•" + NBSP
-    """
-    options = ["-", ">", "*"]
-    return options[depth % len(options)] + NBSP
+# Images are decoded for the available width rounded down to a multiple of this,
+# so that resizing the panel produces only a few variants of each image
+IMAGE_WIDTH_STEP = 50
+RESIZE_DEBOUNCE_MS = 300
 
-
-def get_ol_li_marker(depth, order):
-    return (str(order) if depth % 2 == 0 else chr(96 + order)) + "." + NBSP
+_image_placeholder = None
 
 
 class HtmlText(tktextext.TweakableText):
-    def __init__(self, master, renderer_class, link_and_form_handler, image_requester, read_only=False, **kw):
+    def __init__(self, master, renderer_class, link_and_form_handler, image_requester, read_only=False,
+                 link_hover_handler=None, **kw):
 
         text_options = get_syntax_options_for_tag("TEXT")
+        # Scrolling is observed for loading images only when they get near the visible area
+        self._yscrollcommand = kw.pop("yscrollcommand", None)
+        self._lazy_images_job = None
 
         super().__init__(
             master=master,
@@ -43,35 +46,167 @@ class HtmlText(tktextext.TweakableText):
                 "foreground": text_options["foreground"],
                 # "cursor" : "",
                 **kw,
+                "yscrollcommand": self._on_yscroll,
             }
         )
         self._renderer_class = renderer_class
         self._link_and_form_handler = link_and_form_handler
         self._image_requester = image_requester
+        # Called with the target of the link under the mouse or None when the mouse leaves it
+        self._link_hover_handler = link_hover_handler  # type: Optional[Callable[[Optional[str]], None]]
+        self._hovered_link = None
         self._configure_tags()
+        self._display_list = DisplayList()
+        self._display_list_pos = 0
+        self._sections = []
+        self._render_job = None
+        self._on_render_complete = None  # type: Optional[Callable[[], None]]
+        self._available_image_width = DEFAULT_MAX_IMAGE_WIDTH
+        self._resize_job = None
         self._reset_renderer()
+        self.bind("<Configure>", self._on_configure, True)
 
-    def set_html_content(self, html):
+    def set_html_content(self, html, on_complete: Optional[Callable[[], None]] = None):
+        self.set_display_list(parse_html(html), on_complete)
+
+    def set_display_list(self, display_list: DisplayList, on_complete: Optional[Callable[[], None]] = None):
+        """
+        Applies the first slice of the document immediately and the rest in idle time slices.
+        on_complete is called when the whole document has been rendered. Rendering is cancelled by clear()
+        or by setting new content.
+        """
         self.clear()
-        self._renderer.feed(html)
-        if platform.system() == "Darwin":
-            self._replace_nbsps_with_spaces()
+        self._display_list = display_list
+        self._display_list_pos = 0
+        self._on_render_complete = on_complete
+        self._render_next_slice()
 
-    def _replace_nbsps_with_spaces(self):
-        # NBSP doesn't work properly in Mac, but during rendering
-        # HTML it's useful to keep it separate form regular space.
-        start = "1.0"
-        while True:
-            match = self.search(NBSP, start, exact=True, forwards=True)
-            if not match:
-                break
-            self.direct_delete(match)
-            self.direct_insert(match, " ")
-            start = match + " +1 c"
+    def is_rendering(self) -> bool:
+        return self._render_job is not None
+
+    def _render_next_slice(self):
+        self._render_job = None
+        deadline = time.perf_counter() + RENDER_SLICE_SECONDS
+
+        while self._display_list_pos < len(self._display_list.items):
+            end = self._display_list_pos + RENDER_SLICE_ITEMS
+            self._render_without_events(self._renderer, self._display_list, self._display_list_pos, end)
+            self._display_list_pos = end
+
+            if self._display_list_pos < len(self._display_list.items) and time.perf_counter() >= deadline:
+                self._render_job = self.after_idle(self._render_next_slice)
+                return
+
+        self._finish_rendering()
+
+    def _render_without_events(self, renderer, display_list, start=0, end=None):
+        # One <<TextChange>> per batch instead of one per insert
+        old_suppress = self._suppress_events
+        self._suppress_events = True
+        try:
+            renderer.render(display_list, start, end)
+        finally:
+            self._suppress_events = old_suppress
+
+        if not self._suppress_events:
+            self.event_generate("<<TextChange>>")
+
+    def _finish_rendering(self):
+        self._sections = [section_id for section_id, _ in self._display_list.deferred_sections]
+
+        on_complete, self._on_render_complete = self._on_render_complete, None
+        if on_complete is not None:
+            on_complete()
+
+    def _cancel_rendering(self):
+        if self._render_job is not None:
+            self.after_cancel(self._render_job)
+            self._render_job = None
+        self._on_render_complete = None
+
+    def get_deferred_sections(self) -> List[Tuple[str, str]]:
+        """(section id, url) pairs for elements of the current page, which want their content loaded separately"""
+        return self._display_list.deferred_sections
+
+    def set_section_html_content(self, section_id, html):
+        self.set_section_display_list(section_id, parse_html(html))
+
+    def set_section_display_list(self, section_id, display_list: DisplayList):
+        """Replaces the content of a section of the current page"""
+        start, end = get_section_start_mark(section_id), get_section_end_mark(section_id)
+        if section_id not in self._sections or end not in self.mark_names():
+            return
+
+        self.direct_delete(start, end)
+        # Let the end mark move along with the new content
+        self.mark_gravity(end, "right")
+        try:
+            renderer = self._renderer_class(self, self._link_and_form_handler, self._image_requester,
+                                            fragment_index=start)
+            renderer.share_images_with(self._renderer)
+            self._render_without_events(renderer, display_list)
+        finally:
+            self.mark_gravity(end, "left")
+
+    def get_max_image_width(self, declared_width: Optional[int] = None) -> int:
+        """Width for decoding an image with given width attribute. Wide images are scaled down to fit the view"""
+        if declared_width is None:
+            return self._available_image_width
+        return min(declared_width, self._available_image_width)
+
+    def is_image_visible(self, url, max_width) -> bool:
+        """Whether some occurrence of the image variant is at least partly in the visible area"""
+        for name in self._renderer.get_image_names(url, max_width):
+            try:
+                if self.bbox(name) is not None:
+                    return True
+            except tk.TclError:
+                # Deleted together with a replaced section
+                pass
+        return False
+
+    def _on_yscroll(self, first, last):
+        if self._yscrollcommand is not None:
+            self._yscrollcommand(first, last)
+
+        # Called also when content is added or the view is resized
+        if self._lazy_images_job is None:
+            self._lazy_images_job = self.after_idle(self._request_images_near_view)
+
+    def _request_images_near_view(self):
+        self._lazy_images_job = None
+        first_line = int(self.index("@0,0").split(".")[0])
+        last_line = int(self.index("@0,%d" % self.winfo_height()).split(".")[0])
+        margin = max(last_line - first_line, MIN_LAZY_IMAGE_MARGIN_LINES)
+        self._renderer.request_images(first_line - margin, last_line + margin)
+
+    def _on_configure(self, event):
+        # Images are re-decoded only after resizing has settled
+        if self._resize_job is not None:
+            self.after_cancel(self._resize_job)
+        self._resize_job = self.after(RESIZE_DEBOUNCE_MS, self._update_available_image_width)
+
+    def _update_available_image_width(self):
+        self._resize_job = None
+        width = (self.winfo_width() - 2 * self._x_padding) // IMAGE_WIDTH_STEP * IMAGE_WIDTH_STEP
+        if width <= 0 or width == self._available_image_width:
+            return
+
+        self._available_image_width = width
+        self._renderer.update_image_widths()
+
+    def direct_insert_segments(self, index, *segments):
+        """Like direct_insert, but inserts several (chars, tags) pairs with one Tk call"""
+        self._original_insert(index, *segments)
+        self._edit_count += 1
+        self._last_operation_time = time.time()
+        if not self._suppress_events:
+            self.event_generate("<<TextChange>>")
 
     def _configure_tags(self):
         main_font = tkfont.nametofont("TkDefaultFont")
         x_padding = main_font.measure("m")
+        self._x_padding = x_padding
 
         bold_font = main_font.copy()
         bold_font.configure(weight="bold", size=main_font.cget("size"))
@@ -124,6 +259,7 @@ class HtmlText(tktextext.TweakableText):
         self.tag_bind("a", "<ButtonRelease-1>", self._hyperlink_click)
         self.tag_bind("a", "<Enter>", self._hyperlink_enter)
         self.tag_bind("a", "<Leave>", self._hyperlink_leave)
+        self.tag_bind("a", "<Motion>", self._hyperlink_motion)
 
         gutter_options = get_syntax_options_for_tag("GUTTER")
         self.tag_configure(
@@ -167,251 +303,137 @@ class HtmlText(tktextext.TweakableText):
         self._renderer = self._renderer_class(self, self._link_and_form_handler, self._image_requester)
 
     def clear(self):
+        self._cancel_rendering()
         self.direct_delete("1.0", "mark")
         self.tag_delete("1.0", "mark")
+        for section_id in self._sections:
+            self.mark_unset(get_section_start_mark(section_id), get_section_end_mark(section_id))
+        self._sections = []
+        self._display_list = DisplayList()
+        self._display_list_pos = 0
         self._reset_renderer()
 
-    def _hyperlink_click(self, event):
+    def _get_link_target(self, event) -> Optional[str]:
         mouse_index = self.index("@%d,%d" % (event.x, event.y))
 
         for tag in self.tag_names(mouse_index):
             # formatting tags are alphanumeric
-            if self._renderer._is_link_tag(tag):
-                self._link_and_form_handler(tag)
-                break
-
-    def _hyperlink_enter(self, event):
-        self.config(cursor="hand2")
+            if is_link_tag(tag):
+                return tag
 
-    def _hyperlink_leave(self, event):
-        self.config(cursor="")
-
-    def update_image(self, name, data):
-        self._renderer.update_image(name, data)
+        return None
 
+    def _hyperlink_click(self, event):
+        target = self._get_link_target(event)
+        if target is not None:
+            self._link_and_form_handler(target)
 
-class HtmlRenderer(HTMLParser):
-    def __init__(self, text_widget, link_and_form_handler, image_requester):
-        super().__init__()
-        self.widget = text_widget
-
-        # inserting at "end" acts funny, so I'm creating a mark instead
-        self.widget.direct_insert("end", "\n")
-        self.widget.mark_set("mark", "1.0")
-        self._images_by_name = {}
+    def _hyperlink_enter(self, event):
+        self.config(cursor="hand2")
+        self._hyperlink_motion(event)
 
-        self._link_and_form_handler = link_and_form_handler
-        self._image_requester = image_requester
-        self._unique_tag_count = 0
-        self._context_tags = ["_base_"]
-        self._active_lists = []
-        self._is_active_table = False  # Need to center text later, keep track
-        self._active_ol_item_counts = []
-        self._active_forms = []
-        self._block_tags = ["div", "p", "ul", "ol", "li", "pre", "form", "h1", "h2", "summary", "details", "hr",
-                            "table", "tr", "img"]
-        self._alternatives = {"b": "strong", "i": "em", "th": "td"}
-        self._simple_tags = ["strong", "u", "em"]
-        self._ignored_tags = []
-        self._active_attrs_by_tag = {}  # assuming proper close tags
-
-    def handle_starttag(self, tag, attrs):
-        self._close_void_tags()
-        tag = self._normalize_tag(tag)
-        attrs = dict(attrs)
-        if tag in self._ignored_tags:
-            return
-        else:
-            self._active_attrs_by_tag[tag] = attrs
-
-        if tag in self._block_tags:
-            self._add_block_divider(tag)
-
-        self._add_tag(tag)
-
-        if tag == "a" and "href" in attrs:
-            self._add_tag(attrs["href"])
-        elif tag == "ul":
-            self._active_lists.append("ul")
-        elif tag == "ol":
-            self._active_lists.append("ol")
-            self._active_ol_item_counts.append(0)
-        elif tag == "br":
-            self._append_text(NBSP + "\n")
-        elif tag == "li":
-            if self._active_lists[-1] == "ul":
-                # Set correct li symbol based on the level. Correct for Python indexing
-                self._append_text(get_ul_li_marker(max(0, self._active_lists.count("ul") - 1)))
-            elif self._active_lists[-1] == "ol":
-                self._active_ol_item_counts[-1] += 1
-                # Set correct li symbol based on the level. Correct for Python indexing
-                self._append_text(get_ol_li_marker(self._active_lists.count("ol") - 1, self._active_ol_item_counts[-1]))
-        elif tag == "img":
-            if "src" in attrs:
-                self._append_image(attrs["src"])
-        elif tag == "form":
-            form = attrs.copy()
-            form["inputs"] = []
-            self._active_forms.append(form)
-        elif tag == "input":
-            if not attrs.get("type"):
-                attrs["type"] = "text"
-
-            if attrs["type"] == "hidden":
-                self._add_hidden_form_variable(attrs)
-            elif attrs["type"] == "file":
-                self._append_file_input(attrs)
-            elif attrs["type"] == "submit":
-                self._append_submit_button(attrs)
-        elif tag == "hr":
-            self._append_text("─" * 40)
-        elif tag == "td":  # Need to center text later, keep track
-            self._is_active_table = True
-
-    def handle_endtag(self, tag):
-        tag = self._normalize_tag(tag)
-        if tag in self._ignored_tags:
+    def _hyperlink_motion(self, event):
+        if self._link_hover_handler is None:
             return
-        else:
-            self._active_attrs_by_tag[tag] = {}
-
-        if tag == "ul":
-            self._close_active_list("ul")
-        elif tag == "ol":
-            self._close_active_list("ol")
-            self._active_ol_item_counts.pop()
-        elif tag == "form":
-            self._active_forms.pop()
-        elif tag == "td":  # Need to center text later, keep track
-            self._is_active_table = False
-
-        self._pop_tag(tag)
-
-        # prepare for next piece of text
-        if tag in self._block_tags:
-            self._add_block_divider(tag)
-
-    def handle_data(self, data):
-        self._close_void_tags()
-        # TODO: Not sure if centering of the table content should be done here. Probably should be done here.
-        if self._is_active_table:  # If is table column, center text
-            self._append_text(self._prepare_text(data).center(20, NBSP))
-        else:
-            self._append_text(self._prepare_text(data))
-
-    def _close_void_tags(self):
-        self._context_tags = [tag for tag in self._context_tags if tag not in VOID_TAGS]
 
-    def _is_link_tag(self, tag):
-        return ":" in tag or "/" in tag or "!" in tag
+        target = self._get_link_target(event)
+        if target != self._hovered_link:
+            self._hovered_link = target
+            self._link_hover_handler(target)
 
-    def _create_unique_tag(self):
-        self._unique_tag_count += 1
-        return "_UT_%s" % self._unique_tag_count
-
-    def _normalize_tag(self, tag):
-        return self._alternatives.get(tag, tag)
+    def _hyperlink_leave(self, event):
+        self.config(cursor="")
+        if self._link_hover_handler is not None and self._hovered_link is not None:
+            self._hovered_link = None
+            self._link_hover_handler(None)
 
-    def _add_tag(self, tag):
-        self._context_tags.append(tag)
+    def update_image(self, url, max_width, tk_img):
+        self._renderer.update_image(url, max_width, tk_img)
 
-    def _add_block_divider(self, tag):
-        if tag == "p" and self._context_tags and (self._context_tags[-1] in ["li", "td", "th"]):
-            return
+    def destroy(self):
+        self._cancel_rendering()
+        if self._resize_job is not None:
+            self.after_cancel(self._resize_job)
+            self._resize_job = None
+        if self._lazy_images_job is not None:
+            self.after_cancel(self._lazy_images_job)
+            self._lazy_images_job = None
+        super().destroy()
 
-        # replace all trailing whitespace with a single linebreak
-        while self.widget.get("mark-1c", "mark") in ["\r", "\n", "\t", " "]:
-            self.widget.direct_delete("mark-1c")
 
-        self.widget.direct_insert("mark", "\n",
-                                  tags=[tag for tag in self.widget.tag_names("mark-1c") if tag in self._block_tags])
+class HtmlRenderer:
+    """
+    Applies display lists (see displaylist.py) to the Text widget.
+    """
 
-        # For certain tags add vertical spacer (if it's not there already)
-        if (tag in ("p", "ul", "ol", "summary", "details", "pre", "img")
-                and self.widget.get("mark-2c", "mark") != VERTICAL_SPACER
-                and self.widget.index("mark-1c linestart") != "1.0"):
-            self.widget.direct_insert("mark", VERTICAL_SPACER)
+    def __init__(self, text_widget, link_and_form_handler, image_requester, fragment_index=None):
+        self.widget = text_widget
 
-        # For table, always add vertical spacer.
-        if tag == "table":
-            self.widget.direct_insert("mark", VERTICAL_SPACER)
+        if fragment_index is None:
+            # inserting at "end" acts funny, so I'm creating a mark instead
+            self._mark = "mark"
+            self.widget.direct_insert("end", "\n")
+            self.widget.mark_set(self._mark, "1.0")
+        else:
+            # rendering a fragment into the middle of an existing document
+            self._mark = "fragment_mark"
+            self.widget.mark_set(self._mark, fragment_index)
+        # Names of embedded images by (url, max width)
+        self._images = {}
+        self._image_occurrences = []  # type: List[ImageOccurrence]
+        # Blank images of known size, shown until the real image arrives
+        self._sized_placeholders = {}
+        # NBSP doesn't work properly in Mac, but during parsing
+        # HTML it's useful to keep it separate form regular space.
+        self._replace_nbsps = platform.system() == "Darwin"
 
-    def _pop_tag(self, tag):
-        if tag in VOID_TAGS:
-            self._close_void_tags()
-            return
+        self._link_and_form_handler = link_and_form_handler
+        self._image_requester = image_requester
 
-        while self._context_tags and self._context_tags[-1] != tag:
-            # remove unclosed or synthetic other tags
-            self._context_tags.pop()
-
-        if self._context_tags:
-            assert self._context_tags[-1] == tag
-            self._context_tags.pop()
-
-    def _close_active_list(self, tag):
-        # TODO: active list may also include list item marker
-        while self._active_lists and self._active_lists[-1] != tag:
-            # remove unclosed or synthetic other tags
-            self._active_lists.pop()
-
-        if self._active_lists:
-            assert self._active_lists[-1] == tag
-            self._active_lists.pop()
-
-    def _prepare_text(self, text):
-        text = text.replace("\r\n", "\n")
-        # Note that <code> is inline
-        if "pre" not in self._context_tags:
-            text = text.replace("\n", " ")
-            while "  " in text:
-                text = text.replace("  ", " ")
-
-        # Remove single leading newline in <pre>
-        # see https://html.spec.whatwg.org/multipage/syntax.html#element-restrictions
-        if self._context_tags and self._context_tags[-1] == "pre" and text.startswith("\n"):
-            text = text[1:]
-
-        return text
-
-    def _append_text(self, chars, extra_tags=()):
-        # print("APPP", chars, tags)
-        # don't put two horizontal whitespaces next to each other unless it is pre
-        if self._context_tags and "pre" in self._context_tags:
-            pass
+    def share_images_with(self, other: "HtmlRenderer"):
+        self._images = other._images
+        self._image_occurrences = other._image_occurrences
+        self._sized_placeholders = other._sized_placeholders
+
+    def render(self, display_list: DisplayList, start: int = 0, end: Optional[int] = None):
+        """Applies items[start:end] of the display list, inserting consecutive text runs in one call"""
+        segments = []
+        for item in display_list.items[start:end]:
+            kind = item[0]
+            if kind == TEXT:
+                segments.append(item[1].replace(NBSP, " ") if self._replace_nbsps else item[1])
+                segments.append(item[2])
+                continue
+
+            if segments:
+                self.widget.direct_insert_segments(self._mark, *segments)
+                segments = []
+
+            if kind == IMAGE:
+                self._append_image(item[1], item[2], item[3], item[4])
+            elif kind == WINDOW:
+                self._append_window(self._create_window(item[1], display_list), item[2])
+            elif kind == MARK:
+                self.widget.mark_set(item[1], self._mark)
+                self.widget.mark_gravity(item[1], item[2])
+
+        if segments:
+            self.widget.direct_insert_segments(self._mark, *segments)
+
+    def _create_window(self, spec, display_list: DisplayList):
+        if spec["type"] == "submit":
+            form = display_list.forms[spec["form"]]
+
+            def handler():
+                self._submit_form(form)
+
+            value = spec["value"]
+            btn = ttk.Button(self.widget, text=value, command=handler, width=len(value) + 2)
+            btn.html_attrs = spec["attrs"]
+            return btn
         else:
-            trailing_space = False
-            trailing_tags = set()
-            while self.widget.get("mark-1c") in (" ", "\t"):
-                trailing_space = True
-                trailing_tags.update(self.widget.tag_names("mark-1c"))
-                self.widget.direct_delete("mark-1c")
-
-            last_non_horspace = self.widget.get("mark-1c")
-            if last_non_horspace in ["\n", NBSP]:
-                # don't keep space in the beginning of the line
-                trailing_space = False
-                chars.lstrip(" \t")
-
-            if (trailing_space and not chars.startswith(" ")
-                    and not chars.startswith("\t")):
-                # Restore the required space
-                self.widget.direct_insert("mark", " ", tags=tuple(trailing_tags))
-
-        self.widget.direct_insert("mark", chars, self._get_effective_tags(extra_tags))
-
-    def _append_submit_button(self, attrs):
-        form = self._active_forms[-1]
-
-        def handler():
-            self._submit_form(form)
-
-        value = attrs.get("value", "Submit")
-        btn = ttk.Button(self.widget, text=value, command=handler, width=len(value) + 2)
-        btn.html_attrs = attrs
-        self._append_window(btn)
-        if "name" in attrs:
-            form["fields"].append([attrs, value])
+            # TODO: support also "multiple" flag
+            return ttk.Combobox(self.widget, values=["<active editor>", "main.py", "kala.py"])
 
     def _submit_form(self, form):
         form_data = FormData()
@@ -440,28 +462,31 @@ class HtmlRenderer(HTMLParser):
         else:
             return None
 
-    def _add_hidden_form_variable(self, attrs):
-        self._active_forms[-1]["inputs"].append([attrs, attrs.get("value")])
+    def _append_image(self, url, tags, declared_width=None, declared_height=None):
+        assert url is not None
+        max_width = self.widget.get_max_image_width(declared_width)
+        # Other images are requested when they get near the visible area
+        img_data = self._get_image(url, max_width, request=False)
+        requested = img_data is not None
+        if img_data is None:
+            img_data = self._get_sized_placeholder(declared_width, declared_height, max_width)
 
-    def _append_file_input(self, attrs):
-        # TODO: support also "multiple" flag
-        cb = ttk.Combobox(self.widget, values=["<active editor>", "main.py", "kala.py"])
-        self._append_window(cb)
+        name = self.widget.image_create(self._mark, image=img_data)
+        self._images.setdefault((url, max_width), []).append(name)
+        self._image_occurrences.append(ImageOccurrence(url, declared_width, declared_height, max_width, name,
+                                                       requested))
 
-    def _append_image(self, name, extra_tags=()):
-        assert name is not None
-        index = self.widget.index("mark-1c")
-        img_data = self._get_image(name)
-        if img_data is None:
-            img_data = self._get_image_placeholder()
+        self._tag_last_position(tags)
 
-        img = self.widget.image_create(index, image=img_data)
-        if name not in self._images_by_name:
-            self._images_by_name[name] = []
-        self._images_by_name[name].append(img)
+    def _get_sized_placeholder(self, declared_width, declared_height, max_width):
+        """Keeps the layout from jumping when the image arrives, if the page tells the size"""
+        if declared_width is None or declared_height is None:
+            return self._get_image_placeholder()
 
-        for tag in self._get_effective_tags(extra_tags):
-            self.widget.tag_add(tag, index)
+        size = (max_width, max(1, round(declared_height * max_width / declared_width)))
+        if size not in self._sized_placeholders:
+            self._sized_placeholders[size] = tk.PhotoImage(width=size[0], height=size[1])
+        return self._sized_placeholders[size]
 
     def _get_image_placeholder(self):
         global _image_placeholder
@@ -473,26 +498,81 @@ class HtmlRenderer(HTMLParser):
 
         return _image_placeholder
 
-    def _get_image(self, name):
+    def _get_image(self, url, max_width, request=True):
+        """Returns the image if it is available at once. Otherwise requests it, if asked, and returns None"""
         raise NotImplementedError()
 
-    def _append_window(self, window, extra_tags=()):
-        index = self.widget.index("mark-1c")
-        self.widget.window_create(index, window=window)
-        for tag in self._get_effective_tags(extra_tags):
-            self.widget.tag_add(tag, index)
-
-    def _get_effective_tags(self, extra_tags):
-        tags = set(extra_tags) | set(self._context_tags)
-
-        if self._active_lists:
-            tags.add("list%d" % min(len(self._active_lists), 5))
-
-        return tuple(sorted(tags))
-
-    def update_image(self, name, tk_img):
-        for key in self._images_by_name.get(name, []):
-            self.widget.image_configure(key, image=tk_img)
+    def _append_window(self, window, tags):
+        self.widget.window_create(self._mark, window=window)
+        self._tag_last_position(tags)
+
+    def _tag_last_position(self, tags):
+        # The object was inserted before the mark
+        for tag in tags:
+            self.widget.tag_add(tag, self._mark + "-1c")
+
+    def update_image(self, url, max_width, tk_img):
+        for name in self._images.get((url, max_width), []):
+            self.widget.image_configure(name, image=tk_img)
+
+    def get_image_names(self, url, max_width) -> List[str]:
+        return self._images.get((url, max_width), [])
+
+    def update_image_widths(self):
+        """
+        Switches images to variants for the current available width.
+        An image keeps showing its previous variant until the new one is available.
+        """
+        self._forget_deleted_images()
+        self._images.clear()
+
+        for occ in self._image_occurrences:
+            max_width = self.widget.get_max_image_width(occ.declared_width)
+            self._images.setdefault((occ.url, max_width), []).append(occ.name)
+            if max_width != occ.max_width:
+                occ.max_width = max_width
+                img_data = self._get_image(occ.url, max_width, request=occ.requested)
+                if img_data is None and not occ.requested:
+                    img_data = self._get_sized_placeholder(occ.declared_width, occ.declared_height, max_width)
+                if img_data is not None:
+                    self.widget.image_configure(occ.name, image=img_data)
+
+    def request_images(self, first_line, last_line):
+        """Requests the images between given lines, which haven't been requested yet"""
+        for occ in self._image_occurrences:
+            if occ.requested:
+                continue
+
+            try:
+                line = int(self.widget.index(occ.name).split(".")[0])
+            except tk.TclError:
+                # Deleted together with a replaced section
+                occ.requested = True
+                continue
+
+            if first_line <= line <= last_line:
+                occ.requested = True
+                img_data = self._get_image(occ.url, occ.max_width)
+                if img_data is not None:
+                    self.widget.image_configure(occ.name, image=img_data)
+
+    def _forget_deleted_images(self):
+        existing_names = set(self.widget.image_names())
+        # The list is shared with section renderers, so it is updated in place
+        self._image_occurrences[:] = [occ for occ in self._image_occurrences if occ.name in existing_names]
+
+
+class ImageOccurrence:
+    """An image embedded in the widget"""
+
+    def __init__(self, url: str, declared_width: Optional[int], declared_height: Optional[int], max_width: int,
+                 name: str, requested: bool):
+        self.url = url
+        self.declared_width = declared_width
+        self.declared_height = declared_height
+        self.max_width = max_width
+        self.name = name
+        self.requested = requested
 
 
 class FormData:
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Optional, Dict, List, Tuple
+
+from . import http_client
+
+logger = logging.getLogger(__name__)
+
+MAX_DISK_CACHE_BYTES = 200 * 1024 * 1024
+# Eviction leaves some room, so that the following writes don't need to scan the directory again
+EVICT_TO_FRACTION = 0.9
+
+
+class DiskHttpCache:
+    """
+    Persistent cache for HTTP GET responses (e.g. exercise images) keyed by url.
+
+    Each entry is a single file holding a JSON header line (url, ETag, Last-Modified) followed by the body.
+    Files are written to a temporary file first and then renamed, so that concurrent Thonny instances
+    never see a half-written entry. A cached entry is revalidated with a conditional GET once per session;
+    when the server can't be reached, the cached body is used as it is.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = MAX_DISK_CACHE_BYTES):
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._validated_urls = set()
+        # Size of the entries, counted from the directory on the first write and kept up to date after that.
+        # The directory is scanned again only when the limit is exceeded.
+        self._total_bytes = None  # type: Optional[int]
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, url: str) -> bytes:
+        path = self._get_path(url)
+        entry = self._read_entry(path, url)
+
+        with self._lock:
+            validated = url in self._validated_urls
+        if entry is not None and validated:
+            self._touch(path)
+            return entry[1]
+
+        headers = {}
+        if entry is not None:
+            meta = entry[0]
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            status, resp_headers, body = http_client.get(url, headers)
+        except OSError as e:
+            if entry is not None:
+                logger.info(f"Using cached '{url}' without revalidation: {e!r}")
+                return entry[1]
+            raise
+
+        self._mark_validated(url)
+        if status == 304 and entry is not None:
+            logger.debug(f"Cached '{url}' is still valid")
+            self._touch(path)
+            return entry[1]
+
+        # Header names are case-insensitive
+        resp_headers = {name.lower(): value for name, value in resp_headers.items()}
+        meta = {"url": url, "etag": resp_headers.get("etag"), "last_modified": resp_headers.get("last-modified")}
+        self._write_entry(path, meta, body)
+        return body
+
+    def _mark_validated(self, url):
+        with self._lock:
+            self._validated_urls.add(url)
+
+    def _get_path(self, url: str) -> str:
+        return os.path.join(self._cache_dir, hashlib.sha256(url.encode("UTF-8")).hexdigest())
+
+    def _read_entry(self, path: str, url: str) -> Optional[Tuple[Dict, bytes]]:
+        try:
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline().decode("UTF-8"))
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry for '{url}': {e!r}")
+            return None
+
+        if meta.get("url") != url:
+            return None
+        return meta, body
+
+    def _write_entry(self, path: str, meta: Dict, body: bytes) -> None:
+        data = json.dumps(meta).encode("UTF-8") + b"\n" + body
+        old_size = self._get_size(path)
+        fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache '{meta['url']}': {e!r}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan()[1]
+            else:
+                self._total_bytes += len(data) - old_size
+            exceeded = self._total_bytes > self._max_bytes
+        if exceeded:
+            self._evict()
+
+    @staticmethod
+    def _get_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _touch(path):
+        # Modification time orders entries for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _scan(self) -> Tuple[List[Tuple[float, int, str]], int]:
+        """Returns (modification time, size, path) of the entries and their total size"""
+        entries = []
+        total = 0
+        with os.scandir(self._cache_dir) as it:
+            for dir_entry in it:
+                if dir_entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = dir_entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+                total += stat.st_size
+        return entries, total
+
+    def _evict(self):
+        # Other Thonny instances may have written to the directory meanwhile
+        entries, total = self._scan()
+
+        if total > self._max_bytes:
+            target = self._max_bytes * EVICT_TO_FRACTION
+            # Least recently used first
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+                if total <= target:
+                    break
+
+        with self._lock:
+            self._total_bytes = total
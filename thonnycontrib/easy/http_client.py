@@ -0,0 +1,67 @@
+"""
+Shared keep-alive HTTP session for fetching resources such as exercise images.
+"""
+import threading
+from typing import Dict, Optional, Tuple
+
+MAX_CONNECTIONS_PER_HOST = 4
+MAX_POOLED_HOSTS = 8
+CONNECT_TIMEOUT_SECONDS = 10
+READ_TIMEOUT_SECONDS = 30
+MAX_RESPONSE_BYTES = 20 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class ResponseTooLargeError(IOError):
+    pass
+
+
+def get_session():
+    """
+    The session reuses connections. When all connections to a host are in use, further requests to it wait
+    for a free one instead of opening new connections.
+    """
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_POOLED_HOSTS, pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+                                  pool_block=True)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+
+        return _session
+
+
+def get(url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    Returns status code, response headers and body. 304 and other non-error responses are returned
+    as they are, error statuses are raised.
+
+    All errors are subclasses of IOError.
+    """
+    with get_session().get(url, headers=headers, stream=True,
+                           timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS)) as resp:
+        resp.raise_for_status()
+
+        declared_length = resp.headers.get("Content-Length")
+        if declared_length is not None and declared_length.isdigit() and int(declared_length) > MAX_RESPONSE_BYTES:
+            raise ResponseTooLargeError(f"Response from '{url}' is {declared_length} bytes")
+
+        chunks = []
+        size = 0
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_RESPONSE_BYTES:
+                raise ResponseTooLargeError(f"Response from '{url}' exceeds {MAX_RESPONSE_BYTES} bytes")
+            chunks.append(chunk)
+
+        return resp.status_code, dict(resp.headers), b"".join(chunks)
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+MAX_IMAGE_CACHE_BYTES = 64 * 1024 * 1024
+BYTES_PER_PIXEL = 4
+
+
+class ImageCache:
+    """
+    Decoded images (Tk PhotoImages) in LRU order, limited by their total pixel bytes.
+
+    An url may have several variants, decoded for different maximum widths. Variants pinned by an owner
+    (e.g. the ones a view is showing) are never evicted, other variants of the same url can be.
+    Meant to be used from the UI thread only.
+    """
+
+    def __init__(self, max_bytes: int = MAX_IMAGE_CACHE_BYTES):
+        self._max_bytes = max_bytes
+        self._images = OrderedDict()  # type: OrderedDict[Tuple[str, int], Any]
+        self._sizes = {}  # type: Dict[Tuple[str, int], int]
+        self._total_bytes = 0
+        self._pinned_by_owner = {}  # type: Dict[Hashable, Set[Tuple[str, int]]]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, url: str, max_width: int) -> Optional[Any]:
+        key = (url, max_width)
+        image = self._images.get(key)
+        if image is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._images.move_to_end(key)
+        return image
+
+    def put(self, url: str, max_width: int, image: Any) -> None:
+        key = (url, max_width)
+        self._remove(key)
+        size = image.width() * image.height() * BYTES_PER_PIXEL
+        self._images[key] = image
+        self._sizes[key] = size
+        self._total_bytes += size
+        self._evict()
+
+    def set_pinned(self, owner: Hashable, keys: Iterable[Tuple[str, int]]) -> None:
+        """
+        Replaces the (url, max_width) variants pinned by owner. Previously pinned variants become evictable
+        """
+        keys = set(keys)
+        if keys:
+            self._pinned_by_owner[owner] = keys
+        else:
+            self._pinned_by_owner.pop(owner, None)
+        self._evict()
+
+    def pin(self, owner: Hashable, keys: Iterable[Tuple[str, int]]) -> None:
+        self._pinned_by_owner.setdefault(owner, set()).update(keys)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"images": len(self._images), "bytes": self._total_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def _is_pinned(self, key: Tuple[str, int]) -> bool:
+        return any(key in keys for keys in self._pinned_by_owner.values())
+
+    def _evict(self):
+        if self._total_bytes <= self._max_bytes:
+            return
+
+        # Least recently used first
+        for key in list(self._images):
+            if self._total_bytes <= self._max_bytes:
+                break
+            if not self._is_pinned(key):
+                self._remove(key)
+                self.evictions += 1
+
+    def _remove(self, key):
+        if key in self._images:
+            del self._images[key]
+            self._total_bytes -= self._sizes.pop(key)
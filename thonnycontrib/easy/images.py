@@ -0,0 +1,55 @@
+"""
+Image decoding is split in two: decode_image runs in a worker thread and does the expensive part,
+make_tk_image runs in the UI thread and only wraps the result.
+"""
+import tkinter as tk
+from io import BytesIO
+from typing import Any
+
+# Used while the view doesn't know its own width yet
+DEFAULT_MAX_IMAGE_WIDTH = 250
+
+
+def _get_lanczos(image_module):
+    # Image.Resampling appeared in Pillow 9.1, Image.ANTIALIAS was removed in Pillow 10
+    resampling = getattr(image_module, "Resampling", image_module)
+    return resampling.LANCZOS
+
+
+def decode_image(data: bytes, max_width: int = DEFAULT_MAX_IMAGE_WIDTH) -> Any:
+    """
+    Returns a Pillow image scaled down to max_width, keeping the aspect ratio. Smaller images are not enlarged.
+    Without Pillow the data is returned as it is and Tk decodes it later.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+
+    with BytesIO(data) as fp:
+        img = Image.open(fp)
+        if img.size[0] <= max_width:
+            img.load()
+            return img.convert("RGBA") if img.mode in ("1", "P") else img
+
+        width = max_width
+        height = max(1, round(img.size[1] * width / img.size[0]))
+
+        # JPEG decoder can scale down by a power of two while decoding, which is much cheaper than
+        # decoding at full size. Does nothing for other formats.
+        img.draft("RGB", (width, height))
+
+        if img.mode in ("1", "P"):
+            # These would be resized with nearest neighbour
+            img = img.convert("RGBA")
+
+        return img.resize((width, height), _get_lanczos(Image))
+
+
+def make_tk_image(decoded: Any) -> tk.PhotoImage:
+    """Must be called in the UI thread with the result of decode_image"""
+    if isinstance(decoded, bytes):
+        return tk.PhotoImage(data=decoded)
+
+    from PIL.ImageTk import PhotoImage
+    return PhotoImage(decoded)
@@ -0,0 +1,57 @@
+import atexit
+import hashlib
+import logging
+import os
+import queue
+import re
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FILE_NAME = "lahendus.log"
+MAX_LOG_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 5
+# Earlier versions wrote a new file per day
+DAILY_LOG_FILE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}\.lahendus\.log$")
+DAILY_LOG_RETENTION_DAYS = 14
+MAX_LOGGED_VALUE_CHARS = 200
+
+
+def configure_logging(logger: logging.Logger, log_dir: str) -> None:
+    """
+    Records are put to a queue and written to a size-rotated file by a listener thread,
+    so that logging never waits for disk in the UI thread or in request threads.
+    """
+    file_handler = RotatingFileHandler(os.path.join(log_dir, LOG_FILE_NAME), maxBytes=MAX_LOG_BYTES,
+                                       backupCount=LOG_BACKUP_COUNT, encoding="UTF-8", delay=True)
+    file_handler.setFormatter(logging.Formatter("%(asctime)s;%(levelname)s;%(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler)
+    listener.start()
+    # Flushes the remaining records
+    atexit.register(listener.stop)
+
+    logger.addHandler(QueueHandler(log_queue))
+    _remove_old_daily_logs(log_dir)
+
+
+def _remove_old_daily_logs(log_dir: str) -> None:
+    min_mtime = time.time() - DAILY_LOG_RETENTION_DAYS * 24 * 60 * 60
+    try:
+        with os.scandir(log_dir) as it:
+            for entry in it:
+                if DAILY_LOG_FILE_RE.match(entry.name) and entry.stat().st_mtime < min_mtime:
+                    os.remove(entry.path)
+    except OSError as e:
+        logging.getLogger(__name__).warning(f"Could not remove old logs: {e!r}")
+
+
+def describe_form_data(form_data) -> str:
+    """Form data for logging. Long values (e.g. submitted source code) are replaced by their size and hash"""
+    pairs = []
+    for key, value in form_data.pairs:
+        if isinstance(value, str) and len(value) > MAX_LOGGED_VALUE_CHARS:
+            digest = hashlib.sha256(value.encode("UTF-8")).hexdigest()[:12]
+            value = f"<{len(value)} chars, sha256 {digest}>"
+        pairs.append((key, value))
+    return repr(pairs)
@@ -0,0 +1,80 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class OfflineStore:
+    """
+    Last successful API responses per user in an SQLite database, for browsing when the server can't be reached.
+
+    Values must be JSON serializable. Database errors are logged and otherwise treated as missing data,
+    so that the store never breaks page loads. Can be used from any thread.
+    """
+
+    def __init__(self, db_path: str):
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = None  # type: Optional[sqlite3.Connection]
+
+    def get(self, user: str, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Returns the value and the time it was stored or None"""
+        try:
+            with self._lock:
+                row = self._get_connection().execute(
+                    "SELECT value, stored_at FROM responses WHERE user = ? AND key = ?",
+                    (user, self._encode_key(key))).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read {key} from offline store: {e!r}")
+            return None
+
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def contains(self, user: str, key: Hashable) -> bool:
+        try:
+            with self._lock:
+                return self._get_connection().execute(
+                    "SELECT 1 FROM responses WHERE user = ? AND key = ?",
+                    (user, self._encode_key(key))).fetchone() is not None
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read {key} from offline store: {e!r}")
+            return False
+
+    def put(self, user: str, key: Hashable, value: Any) -> None:
+        try:
+            encoded_value = json.dumps(value)
+            with self._lock:
+                with self._get_connection() as connection:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO responses (user, key, value, stored_at) VALUES (?, ?, ?, ?)",
+                        (user, self._encode_key(key), encoded_value, time.time()))
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Could not write {key} to offline store: {e!r}")
+
+    def remove_user(self, user: str) -> None:
+        try:
+            with self._lock:
+                with self._get_connection() as connection:
+                    connection.execute("DELETE FROM responses WHERE user = ?", (user,))
+        except sqlite3.Error as e:
+            logger.warning(f"Could not remove user data from offline store: {e!r}")
+
+    def _get_connection(self) -> sqlite3.Connection:
+        # Opened on first use, access is serialized by the lock
+        if self._connection is None:
+            connection = sqlite3.connect(self._db_path, timeout=5, check_same_thread=False)
+            connection.execute("CREATE TABLE IF NOT EXISTS responses "
+                               "(user TEXT, key TEXT, value TEXT, stored_at REAL, PRIMARY KEY (user, key))")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    @staticmethod
+    def _encode_key(key: Hashable) -> str:
+        return json.dumps(list(key) if isinstance(key, tuple) else key)
@@ -0,0 +1,178 @@
+import concurrent.futures
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("value", "fetched_at", "ttl")
+
+    def __init__(self, value, fetched_at: float, ttl: float):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class ResponseCache:
+    """
+    Size limited LRU cache for API responses.
+
+    Fresh entries (younger than their TTL) are returned as is. Stale entries (older than TTL, but not older than
+    TTL + max_stale) are returned as well, but a background refresh is started for them and on_refresh is called
+    with the key once the fresh value has been stored. Older entries are reloaded synchronously. Callers can give
+    a shorter max_stale for values which mustn't look current long after they have changed.
+
+    Concurrent loads of the same key are merged: other callers wait for the running load and get its result.
+    If it takes longer than max_wait, they load the value themselves.
+    Values loaded before their key was invalidated or the cache was cleared are not stored.
+    """
+
+    def __init__(self, max_entries: int = 256, max_stale: float = 24 * 60 * 60, refresh_threads: int = 2,
+                 max_wait: float = 30):
+        self._max_entries = max_entries
+        self._max_stale = max_stale
+        self._max_wait = max_wait
+        self._entries = OrderedDict()  # type: OrderedDict[Hashable, _Entry]
+        self._refreshing = set()
+        # Refreshes which haven't returned from on_refresh yet
+        self._running_refreshes = 0
+        self._loading = {}  # type: Dict[Hashable, concurrent.futures.Future]
+        self._generation = 0
+        # Bumped by invalidate. Together with the generation it identifies the state a value was loaded in.
+        self._key_versions = {}  # type: Dict[Hashable, int]
+        self._lock = threading.RLock()
+        self._refresh_executor = concurrent.futures.ThreadPoolExecutor(max_workers=refresh_threads,
+                                                                       thread_name_prefix="lahendus-refresh")
+
+    def get(self, key: Hashable, loader: Callable[[], Any], ttl: float,
+            on_refresh: Optional[Callable[[Hashable], None]] = None, max_stale: Optional[float] = None) -> Any:
+        if max_stale is None:
+            max_stale = self._max_stale
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = entry.age()
+                if age < entry.ttl:
+                    self._entries.move_to_end(key)
+                    return entry.value
+                elif age < entry.ttl + max_stale:
+                    self._entries.move_to_end(key)
+                    self._start_refresh(key, loader, ttl, on_refresh)
+                    return entry.value
+
+            loading = self._loading.get(key)
+            is_loader = loading is None
+            if is_loader:
+                loading = concurrent.futures.Future()
+                self._loading[key] = loading
+                version = self.get_version(key)
+
+        if not is_loader:
+            try:
+                return loading.result(self._max_wait)
+            except concurrent.futures.TimeoutError:
+                # The running load may hang, e.g. on a call without a socket timeout
+                logger.info(f"Loading '{key}' takes over {self._max_wait} seconds, loading it separately")
+                version = self.get_version(key)
+                value = loader()
+                self._store(key, value, ttl, version)
+                return value
+
+        try:
+            value = loader()
+        except BaseException as e:
+            loading.set_exception(e)
+            raise
+        else:
+            self._store(key, value, ttl, version)
+            loading.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                if self._loading.get(key) is loading:
+                    del self._loading[key]
+
+    def put(self, key: Hashable, value: Any, ttl: float, version: Optional[Tuple[int, int]] = None) -> bool:
+        """
+        Stores a value loaded outside of get. Given the version from before loading, the value is dropped
+        if the key has been invalidated meanwhile. Returns whether the value was stored.
+        """
+        with self._lock:
+            return self._store(key, value, ttl, self.get_version(key) if version is None else version)
+
+    def get_version(self, key: Hashable) -> Tuple[int, int]:
+        with self._lock:
+            return self._generation, self._key_versions.get(key, 0)
+
+    def peek(self, key: Hashable) -> Any:
+        """Returns the cached value regardless of its age or None if the key is not cached"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry.value
+
+    def is_refreshing(self) -> bool:
+        """Whether some background refresh may still call on_refresh"""
+        with self._lock:
+            return self._running_refreshes > 0
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                # Loads already running for the key must not bring back the old value
+                # and later callers must not wait for them
+                self._key_versions[key] = self._key_versions.get(key, 0) + 1
+                self._loading.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._loading.clear()
+            # Refreshes started before clearing must not bring back old values
+            self._generation += 1
+
+    def _store(self, key: Hashable, value: Any, ttl: float, version: Tuple[int, int]) -> bool:
+        with self._lock:
+            if version != self.get_version(key):
+                return False
+
+            self._entries[key] = _Entry(value, time.time(), ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def _start_refresh(self, key, loader, ttl, on_refresh):
+        if key in self._refreshing:
+            return
+
+        self._refreshing.add(key)
+        self._running_refreshes += 1
+        version = self.get_version(key)
+
+        def refresh():
+            try:
+                try:
+                    value = loader()
+                except Exception as e:
+                    logger.info(f"Background refresh of '{key}' failed: {e!r}")
+                    return
+                finally:
+                    with self._lock:
+                        self._refreshing.discard(key)
+
+                if self._store(key, value, ttl, version) and on_refresh is not None:
+                    on_refresh(key)
+            finally:
+                with self._lock:
+                    self._running_refreshes -= 1
+
+        self._refresh_executor.submit(refresh)
@@ -1,21 +1,48 @@
 import json
 import logging
 import os
+import threading
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 import chevron
+from chevron.tokenizer import tokenize
 
 from thonnycontrib.easy.ui import EDITOR_CONTENT_NAME
 
 logger = logging.getLogger(__name__)
 
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+TEMPLATE_SUFFIX = ".mustache"
+
+# Token lists of all templates by file name, loaded when the first template is needed
+_template_tokens = None  # type: Optional[Dict[str, List[Tuple[str, str]]]]
+_template_tokens_lock = threading.Lock()
+
+
+def _get_template_tokens(template_name: str) -> List[Tuple[str, str]]:
+    global _template_tokens
+
+    # Rendering happens in worker threads
+    with _template_tokens_lock:
+        if _template_tokens is None:
+            _template_tokens = _load_templates()
+
+    return _template_tokens[template_name]
+
+
+def _load_templates() -> Dict[str, List[Tuple[str, str]]]:
+    result = {}
+    for name in os.listdir(TEMPLATES_DIR):
+        if name.endswith(TEMPLATE_SUFFIX):
+            with open(os.path.join(TEMPLATES_DIR, name), mode="r", encoding="UTF-8") as f:
+                result[name] = list(tokenize(f.read()))
+    return result
 
-def render(template_name: str, data: Dict) -> str:
-    res_path = os.path.join(os.path.dirname(__file__), "templates", template_name)
 
-    with open(res_path, mode="r", encoding="UTF-8") as f:
-        return chevron.render(f, data)
+def render(template_name: str, data: Dict) -> str:
+    # chevron accepts a token list in place of the template text
+    return chevron.render(_get_template_tokens(template_name), data)
 
 
 def generate_update_html(versions, lang="et"):
@@ -66,6 +93,20 @@ def generate_error_html(error_msg, lang="et") -> str:
         return f"<h1>Error!</h1><div>{error_msg}</div>"
 
 
+def generate_section_error_html(error_msg, lang="et") -> str:
+    """Error in a separately loaded part of a page. The rest of the page stays usable."""
+    if lang == "et":
+        return f"<div>⚠ Laadimine ebaõnnestus: {error_msg}</div><br/>"
+    else:
+        return f"<div>⚠ Loading failed: {error_msg}</div><br/>"
+
+
+def generate_section_login_html(from_url, lang="et") -> str:
+    button = "Logi sisse" if lang == "et" else "Log in"
+    return f"""<form action="/auth"><input type="hidden" name="from" value="{from_url}"/>
+<input type="submit" value="{button}"/></form><br/>"""
+
+
 def generate_error_auth(lang="et") -> str:
     if lang == "et":
         return f"""<h1>Autentimine ebaõnnestus!</h1><a href="/auth">Alusta autentimist uuesti</a>"""
@@ -73,6 +114,14 @@ def generate_error_auth(lang="et") -> str:
         return f"""<h1>Authentication Failed!</h1><a href='/auth'>Start authentication again</a>"""
 
 
+def generate_offline_html(stored_at: float, lang="et") -> str:
+    stored_at = datetime.fromtimestamp(stored_at).strftime('%d.%m.%Y %H:%M')
+    if lang == "et":
+        return f"<p><em>⚠ Ühendus puudub, andmed seisuga {stored_at}</em></p>"
+    else:
+        return f"<p><em>⚠ Offline, data from {stored_at}</em></p>"
+
+
 def _convert_to_str(value):
     if value is None:
         return value
@@ -133,153 +182,176 @@ def _process_test(test, locale_dict):
     return result
 
 
-def generate_exercise_html(provider, course_id, exercise_id, lang="et") -> str:
-    strings_en = {"CLOSED_DENIED_INFO": "This exercise is closed and does not allow any new submissions",
-                  "POINTS_TITLE": "Valid grade",
-                  "SUBMITTING_TITLE": "Submit",
-                  "SUBMIT_ACTIVE": "Submit the contents of the active editor",
-                  "TEACHER_COMMENT": "Teacher feedback",
-                  "AUTOMATIC_TESTS": "Automated tests",
-                  "LAST_SUBMISSION": "Latest submission",
-                  "SEE_IN_LAHENDUS": "See the task in Lahendus",
-                  "GAVE_INPUTS": "Inputs provided to the program",
-                  "OUTPUT_WAS": "The program's full output",
-                  "EXCEPTION": "There was an exception during the program's execution",
-                  "CREATED_FILES": "Before running the program, the following files were created"
-                  }
-
-    strings_et = {"CLOSED_DENIED_INFO": "See ülesanne on suletud ja ei luba enam uusi esitusi",
-                  "SUBMITTING_TITLE": "Esitamine",
-                  "POINTS_TITLE": "Kehtiv hinne",
-                  "SUBMIT_ACTIVE": "Esita aktiivse redaktori sisu",
-                  "TEACHER_COMMENT": "Tagasiside",
-                  "AUTOMATIC_TESTS": "Automaatsed testid",
-                  "LAST_SUBMISSION": "Viimane esitus",
-                  "SEE_IN_LAHENDUS": "Vaata ülesannet Lahenduses",
-                  "GAVE_INPUTS": "Andsin programmile sisendid",
-                  "OUTPUT_WAS": "Programmi täielik väljund oli",
-                  "EXCEPTION": "Programmi käivitamisel tekkis viga",
-                  "CREATED_FILES": "Enne programmi käivitamist lõin failid"
-                  }
-
-    strings = strings_et if lang == "et" else strings_en
-
-    details = provider.easy.student.get_exercise_details(course_id, exercise_id)
-
-    def _format_teacher_activity(ta, lang="et"):
-        if ta is None:
-            ta = {}
-
-        feedback = ta.get("feedback", {})
-        if feedback is None:
-            feedback = {}
-
-        teacher = ta.get("teacher", {})
-        teacher = teacher.get("given_name", "") + " " + teacher.get("family_name", "")
-
-        feedback_html = feedback.get("feedback_html", "")
-        grade = ta.get("grade", "")
-        created_at = ta.get("created_at", "")
-        submission_number = ta.get("submission_number", "")
-
-        # Format the date
-        try:
-            date_obj = datetime.strptime(created_at, '%Y-%m-%dT%H:%M:%SZ')
-            created_at = date_obj.strftime('%d.%m.%Y %H:%M')
-        except ValueError:
-            pass  # In case of a formatting error, leave it as is
-
-        logger.error(grade)
-        if grade == "" or grade is None:
-            grade_text = ""
-        else:
-            grade_text = f" · Hinne: <b>{grade} / 100</b> " if lang == "et" else f" · Grade: <b>{grade} / 100</b> "
-        submission_text = f"Esitus # {submission_number}" if lang == "et" else f"Submission # {submission_number}"
+_STRINGS_EN = {"CLOSED_DENIED_INFO": "This exercise is closed and does not allow any new submissions",
+               "POINTS_TITLE": "Valid grade",
+               "SUBMITTING_TITLE": "Submit",
+               "SUBMIT_ACTIVE": "Submit the contents of the active editor",
+               "TEACHER_COMMENT": "Teacher feedback",
+               "AUTOMATIC_TESTS": "Automated tests",
+               "ASSESSING": "⌛ The submission is being assessed...",
+               "ASSESSING_LONG": "Assessment takes longer than usual.",
+               "CHECK_AGAIN": "Check again",
+               "LAST_SUBMISSION": "Latest submission",
+               "SEE_IN_LAHENDUS": "See the task in Lahendus",
+               "GAVE_INPUTS": "Inputs provided to the program",
+               "OUTPUT_WAS": "The program's full output",
+               "EXCEPTION": "There was an exception during the program's execution",
+               "CREATED_FILES": "Before running the program, the following files were created"
+               }
+
+_STRINGS_ET = {"CLOSED_DENIED_INFO": "See ülesanne on suletud ja ei luba enam uusi esitusi",
+               "SUBMITTING_TITLE": "Esitamine",
+               "POINTS_TITLE": "Kehtiv hinne",
+               "SUBMIT_ACTIVE": "Esita aktiivse redaktori sisu",
+               "TEACHER_COMMENT": "Tagasiside",
+               "AUTOMATIC_TESTS": "Automaatsed testid",
+               "ASSESSING": "⌛ Esitust kontrollitakse...",
+               "ASSESSING_LONG": "Kontrollimine võtab tavalisest kauem.",
+               "CHECK_AGAIN": "Vaata uuesti",
+               "LAST_SUBMISSION": "Viimane esitus",
+               "SEE_IN_LAHENDUS": "Vaata ülesannet Lahenduses",
+               "GAVE_INPUTS": "Andsin programmile sisendid",
+               "OUTPUT_WAS": "Programmi täielik väljund oli",
+               "EXCEPTION": "Programmi käivitamisel tekkis viga",
+               "CREATED_FILES": "Enne programmi käivitamist lõin failid"
+               }
+
+
+def _get_strings(lang):
+    return _STRINGS_ET if lang == "et" else _STRINGS_EN
+
+
+def _format_teacher_activity(ta, lang="et"):
+    if ta is None:
+        ta = {}
+
+    feedback = ta.get("feedback", {})
+    if feedback is None:
+        feedback = {}
+
+    teacher = ta.get("teacher", {})
+    teacher = teacher.get("given_name", "") + " " + teacher.get("family_name", "")
+
+    feedback_html = feedback.get("feedback_html", "")
+    grade = ta.get("grade", "")
+    created_at = ta.get("created_at", "")
+    submission_number = ta.get("submission_number", "")
+
+    # Format the date
+    try:
+        date_obj = datetime.strptime(created_at, '%Y-%m-%dT%H:%M:%SZ')
+        created_at = date_obj.strftime('%d.%m.%Y %H:%M')
+    except ValueError:
+        pass  # In case of a formatting error, leave it as is
+
+    if grade == "" or grade is None:
+        grade_text = ""
+    else:
+        grade_text = f" · Hinne: <b>{grade} / 100</b> " if lang == "et" else f" · Grade: <b>{grade} / 100</b> "
+    submission_text = f"Esitus # {submission_number}" if lang == "et" else f"Submission # {submission_number}"
+
+    html_output = f"<br/>    - {teacher} · {created_at} · {submission_text}{grade_text}<br/>"
+    if feedback_html:
+        html_output += f"{feedback_html}"
+
+    return html_output
+
 
-        html_output = f"<br/>    - {teacher} · {created_at} · {submission_text}{grade_text}<br/>"
-        if feedback_html:
-            html_output += f"{feedback_html}"
+def is_assessment_in_progress(bundle) -> bool:
+    return bool(bundle.submissions) and bundle.submissions[0].get("autograde_status") == "IN_PROGRESS"
 
-        return html_output
 
-    def has_submissions() -> bool:
-        return len(provider.easy.student.get_all_submissions(course_id, exercise_id).submissions) > 0
+def generate_feedback_html(bundle, lang="et", retry_url: Optional[str] = None) -> str:
+    """
+    Grade and feedback section of the exercise page. Rendered separately, so that it can be loaded later while
+    automatic assessment is in progress.
+    """
+    strings = _get_strings(lang)
 
-    if not has_submissions():
-        return render("exercise.mustache", {"effective_title": details.effective_title,
-                                            "text_html": details.text_html,
-                                            "is_open": details.is_open,
-                                            "not_open": not details.is_open,
-                                            "points": None,
+    if not bundle.submissions:
+        return render("feedback.mustache", {"points": None,
                                             "feedback_type": None,
                                             "feedback_auto": None,
-                                            "solution": None,
-                                            "EDITOR_CONTENT_NAME": EDITOR_CONTENT_NAME,
-                                            "course_id": course_id,
-                                            "exercise_id": exercise_id,
-                                            "latest_feedback_teacher": None,
-                                            "provider_url": provider.easy.util.idp_client_name} | strings)
-    else:
-        # Wait or AT assessment finish
-        provider.easy.student.await_latest_exercise_submission_details(course_id, exercise_id)
-        latest = provider.easy.student.get_all_submissions(course_id, exercise_id).submissions[0]
-        grade_resp = latest.get("grade", {})
-
-        # Python evals grade 0 to False later in the template. Convert to str
-        points = None if grade_resp is None else str(grade_resp.get("grade", None))
+                                            "assessing": False,
+                                            "latest_feedback_teacher": None} | strings)
 
-        if points == "None":
-            points = None
+    latest = bundle.submissions[0]
+    grade_resp = latest.get("grade", {})
 
+    # Python evals grade 0 to False later in the template. Convert to str
+    points = None if grade_resp is None else str(grade_resp.get("grade", None))
 
-        is_autograde = False if grade_resp is None else grade_resp.get("is_autograde", False)
-        feedback_type = "" if is_autograde else "🙎"
-        feedback_auto = None
+    if points == "None":
+        points = None
 
-        try:
-            auto_assessment = latest.get("auto_assessment", {})
+    is_autograde = False if grade_resp is None else grade_resp.get("is_autograde", False)
+    feedback_type = "" if is_autograde else "🙎"
+    feedback_auto = None
 
-            js = json.loads(auto_assessment.get("feedback", '{}'))
-            if "result_type" in js:
-                result_type = js["result_type"]
+    try:
+        auto_assessment = latest.get("auto_assessment", {})
 
-                if result_type == "OK_V3":
-                    if js["pre_evaluate_error"] is None:
-                        test_results = [_process_test(test, strings) for test in js["tests"]]
-                        feedback_auto = '\n'.join(test_results)
-                    else:
-                        feedback_auto = js["pre_evaluate_error"]
+        js = json.loads(auto_assessment.get("feedback", '{}'))
+        if "result_type" in js:
+            result_type = js["result_type"]
 
-                elif result_type == "OK_LEGACY":
-                    feedback_auto = js["feedback"]
+            if result_type == "OK_V3":
+                if js["pre_evaluate_error"] is None:
+                    test_results = [_process_test(test, strings) for test in js["tests"]]
+                    feedback_auto = '\n'.join(test_results)
+                else:
+                    feedback_auto = js["pre_evaluate_error"]
 
-                elif result_type == "ERROR_V3":
-                    feedback_auto = js["error"]
-            else:
-                feedback_auto = auto_assessment.get("feedback", "")
+            elif result_type == "OK_LEGACY":
+                feedback_auto = js["feedback"]
 
-        except json.decoder.JSONDecodeError:
+            elif result_type == "ERROR_V3":
+                feedback_auto = js["error"]
+        else:
             feedback_auto = auto_assessment.get("feedback", "")
-        except Exception as e:
-            logger.error(latest)
-            logger.exception(e, stacklevel=True, exc_info=True)
 
-        activities = provider.easy.student.get_all_exercise_teacher_activities(course_id, exercise_id).teacher_activities
+    except json.decoder.JSONDecodeError:
+        feedback_auto = auto_assessment.get("feedback", "")
+    except Exception as e:
+        logger.error(latest)
+        logger.exception(e, stacklevel=True, exc_info=True)
+
+    activities = bundle.teacher_activities
+    if activities is not None:
         activities = sorted(activities, key=lambda x: x.get('created_at', ""), reverse=True)
 
-        # Or you can directly sort the list in place:
-        teacher_activites = [_format_teacher_activity(ta, lang) for ta in activities] if activities is not None else []
-        teacher_activites = "\n\n".join(teacher_activites)
-        return render("exercise.mustache", {"effective_title": details.effective_title,
-                                            "text_html": details.text_html,
-                                            "is_open": details.is_open,
-                                            "not_open": not details.is_open,
-                                            "points": points,
-                                            "feedback_type": feedback_type,
-                                            "feedback_auto": feedback_auto,
-                                            "solution": latest.get("solution", ""),
-                                            "EDITOR_CONTENT_NAME": EDITOR_CONTENT_NAME,
-                                            "course_id": course_id,
-                                            "exercise_id": exercise_id,
-                                            "latest_feedback_teacher": teacher_activites,
-                                            "provider_url": provider.easy.util.idp_client_name} | strings)
+    # Or you can directly sort the list in place:
+    teacher_activites = [_format_teacher_activity(ta, lang) for ta in activities] if activities is not None else []
+    teacher_activites = "\n\n".join(teacher_activites)
+    return render("feedback.mustache", {"points": points,
+                                        "feedback_type": feedback_type,
+                                        "feedback_auto": feedback_auto,
+                                        "assessing": is_assessment_in_progress(bundle),
+                                        "retry_url": retry_url,
+                                        "latest_feedback_teacher": teacher_activites} | strings)
+
+
+def generate_exercise_html(bundle, lang="et") -> str:
+    course_id, exercise_id, details = bundle.course_id, bundle.exercise_id, bundle.details
+
+    if is_assessment_in_progress(bundle):
+        # Feedback section is loaded separately when the assessment finishes
+        assessment_url = f"/student/courses/{course_id}/exercises/{exercise_id}/assessment"
+        feedback_html = None
+    else:
+        assessment_url = None
+        feedback_html = generate_feedback_html(bundle, lang)
+
+    solution = bundle.submissions[0].get("solution", "") if bundle.submissions else None
+
+    return render("exercise.mustache", {"effective_title": details.effective_title,
+                                        "text_html": details.text_html,
+                                        "is_open": details.is_open,
+                                        "not_open": not details.is_open,
+                                        "solution": solution,
+                                        "EDITOR_CONTENT_NAME": EDITOR_CONTENT_NAME,
+                                        "course_id": course_id,
+                                        "exercise_id": exercise_id,
+                                        "assessment_url": assessment_url,
+                                        "feedback_html": feedback_html,
+                                        "provider_url": bundle.provider_url} | _get_strings(lang))
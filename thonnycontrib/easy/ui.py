@@ -1,32 +1,97 @@
 import concurrent.futures
+import logging
 import platform
+import time
 import tkinter as tk
 import traceback
-from io import BytesIO
 from tkinter import ttk, messagebox
-from typing import Tuple, List, Optional, Callable, Union
-from urllib.request import urlopen
+from typing import Tuple, List, Optional, Callable, Union, Dict
 
 from thonny import tktextext, get_workbench
 from thonny.ui_utils import scrollbar_style, lookup_style_option
 
+from . import http_client
+from .displaylist import parse_html
+from .history import (PageCache, CachedPage, NavigationHistory, load_page_snapshot, save_page_snapshot,
+                      remove_page_snapshot)
+from .image_cache import ImageCache
+from .images import decode_image, make_tk_image
+from .ui_queue import UiQueue
 from .htmltext import FormData, HtmlText, HtmlRenderer
 
 EDITOR_CONTENT_NAME = "$EDITOR_CONTENT"
+WAITING_HTML = "<p>⌛...</p>"
 
-_images_by_urls = {}
+# Prefetching warms up provider caches for pages the user is likely to open next
+PREFETCH_BUDGET = 100  # prefetches per session
+PREFETCH_REPEAT_SECONDS = 60
+PREFETCH_HOVER_DELAY_MS = 150
+
+MAX_RUNNING_IMAGE_REQUESTS = http_client.MAX_CONNECTIONS_PER_HOST
+
+# Shared by all views. Each view pins the image variants it is showing.
+_image_cache = ImageCache()
+
+logger = logging.getLogger(__name__)
 
 
 class ExercisesView(ttk.Frame):
-    def __init__(self, master, exercise_provider_class):
+    def __init__(self, master, exercise_provider_class: Callable[["ExercisesView"], "ExerciseProvider"],
+                 snapshot_path: Optional[str] = None):
         self._destroyed = False
-        self._poll_scheduler = None
         super().__init__(master, borderwidth=0, relief="flat")
 
-        self._provider = exercise_provider_class(self)
-        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._provider.get_max_threads())
+        # Views may be created during Thonny startup even if they are not shown. The provider and its imports
+        # are created in a worker thread and the first page is loaded only when the view is first shown.
+        self._provider_factory = exercise_provider_class
+        self._provider = None  # type: Optional[ExerciseProvider]
+        self._provider_future = None  # type: Optional[concurrent.futures.Future]
+        self._executor = None  # type: Optional[concurrent.futures.ThreadPoolExecutor]
         self._page_future = None  # type: Optional[concurrent.futures.Future]
-        self._image_futures = {}
+        self._page_future_is_reload = False
+        self._page_future_url = None  # type: Optional[str]
+        self._pending_yview = None
+        # Images have their own workers, so that pages with many images don't hold up page loads.
+        # Connections per host are limited anyway.
+        self._image_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=MAX_RUNNING_IMAGE_REQUESTS, thread_name_prefix="lahendus-image")
+        self._image_futures = {}  # type: Dict[Tuple[str, int], concurrent.futures.Future]
+        # Requested images of the current page wait here in document order and are handed to the workers
+        # a few at a time, visible ones first. Waiting requests are dropped when the page changes.
+        self._pending_image_requests = {}  # type: Dict[Tuple[str, int], None]
+        self._image_dispatch_job = None
+        self._section_futures = {}  # type: Dict[str, concurrent.futures.Future]
+        # Sections of a page rendered before the provider was ready
+        self._deferred_sections_waiting = False
+
+        # Prefetches run one at a time in their own thread, so that they don't compete with page loads for workers.
+        # Pending prefetches are cancelled when the user navigates.
+        self._prefetch_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="lahendus-prefetch")
+        self._prefetch_futures = {}  # type: Dict[str, concurrent.futures.Future]
+        self._prefetch_budget = PREFETCH_BUDGET
+        self._prefetched_at = {}  # type: Dict[str, float]
+        self._hover_prefetch_job = None
+
+        # Canonical url and html of the page being shown, used for reloading it when the provider has fresher data
+        self._current_url = None  # type: Optional[str]
+        self._current_html = None  # type: Optional[str]
+        # Urls of pages to reload if they are shown. None stands for any page.
+        self._reload_urls = set()
+
+        # Recently shown pages are re-shown at once when going back or forward and revalidated in the background
+        self._page_cache = PageCache()
+        self._history = NavigationHistory()
+
+        # The last page of the previous session is shown at startup and revalidated when the provider is ready
+        self._snapshot_path = snapshot_path
+        self._snapshot_key = None  # type: Optional[Tuple[str, str]]
+        # Page to go to when the provider is ready. Links clicked before that replace it.
+        self._start_url = "/"
+        self._start_form_data = FormData()
+
+        # Results of worker threads are picked up in the UI thread, which polls only while work is outstanding
+        self._ui_queue = UiQueue(self, self._process_provider_responses, self._has_background_work)
 
         self.columnconfigure(0, weight=1)
         self.rowconfigure(1, weight=1)
@@ -52,6 +117,7 @@ class ExercisesView(ttk.Frame):
             renderer_class=ExerciseHtmlRenderer,
             link_and_form_handler=self._on_request_new_page,
             image_requester=self._on_request_image,
+            link_hover_handler=self._on_link_hover,
             read_only=True,
             wrap="word",
             font="TkDefaultFont",
@@ -65,60 +131,147 @@ class ExercisesView(ttk.Frame):
         )
 
         self._html_widget.grid(row=1, column=0, sticky="nsew")
+        self._html_widget.bind("<Alt-Left>", lambda event: self.go_back(), True)
+        self._html_widget.bind("<Alt-Right>", lambda event: self.go_forward(), True)
 
         self.vert_scrollbar["command"] = self._html_widget.yview
         self.hor_scrollbar["command"] = self._html_widget.xview
 
-        self._poll_scheduler = None
+        snapshot = load_page_snapshot(snapshot_path) if snapshot_path is not None else None
+        if snapshot is not None:
+            # Going to it later finds it in the cache
+            self._page_cache.put(snapshot)
+            self._snapshot_key = (snapshot.url, snapshot.html)
+            self._start_url = snapshot.url
+            self._current_url = snapshot.url
+            self._set_page(snapshot.html, snapshot.display_list)
+            self.breadcrumbs_bar.set_links(snapshot.breadcrumbs)
+        else:
+            self._set_page(WAITING_HTML, parse_html(WAITING_HTML))
+        self.bind("<Map>", self._on_map, True)
+
+    def _on_map(self, event=None):
+        if self._provider is not None or self._provider_future is not None:
+            return
+
+        starter = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="lahendus-start")
+        self._provider_future = self._submit(self._provider_factory, self, executor=starter)
+        starter.shutdown(wait=False)
+
+    def _start(self, provider_future: concurrent.futures.Future):
+        try:
+            self._provider = provider_future.result()
+        except Exception as exc:
+            # Next showing of the view tries again
+            html = "<pre>%s</pre>" % "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+            self._set_page(html, parse_html(html))
+            return
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._provider.get_max_threads())
+        self.go_to(self._start_url, self._start_form_data)
+
+    def _submit(self, fn, *args, executor=None) -> concurrent.futures.Future:
+        fut = (executor or self._executor).submit(fn, *args)
+        self._ui_queue.track(fut)
+        return fut
 
-        # TODO: go to last page from previous session?
-        self.go_to("/")
-        self._poll_provider_responses()
+    def _has_background_work(self):
+        """Whether the provider may still call request_reload or clear_page_cache from another thread"""
+        return self._provider is not None and self._provider.has_background_work()
 
-    def _poll_provider_responses(self):
+    def _process_provider_responses(self):
         if self._destroyed:
             return
 
+        if self._provider_future is not None and self._provider_future.done():
+            provider_future, self._provider_future = self._provider_future, None
+            self._start(provider_future)
+
         if self._page_future is not None and self._page_future.done():
             # Cancelled futures won't make it here
             assert not self._page_future.cancelled()
 
             exc = self._page_future.exception()
             if exc is not None:
-                self._set_page_html("<pre>%s</pre>" %
-                                    "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
-                                    )
+                if not self._page_future_is_reload:
+                    self._current_url = None
+                    html = "<pre>%s</pre>" % "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+                    self._set_page(html, parse_html(html))
             else:
-                html, breadcrumbs = self._page_future.result()
-                self._set_page_html(html)
-                self.breadcrumbs_bar.set_links(breadcrumbs)
+                html, breadcrumbs, display_list = self._page_future.result()
+                # Last breadcrumb points to the page itself
+                page_url = breadcrumbs[-1][0] if breadcrumbs else None
+                if not self._page_future_is_reload or html != self._current_html:
+                    yview = self._html_widget.yview() if self._page_future_is_reload else self._pending_yview
+                    self._current_url = page_url
+                    self._set_page(html, display_list, yview)
+                    self.breadcrumbs_bar.set_links(breadcrumbs)
+
+                if not self._page_future_is_reload and page_url is not None:
+                    self._history.set_current_url(page_url)
+                    self._update_nav_buttons()
+                    self._prefetch_for_page(page_url)
+
+                # Pages shown for other urls (login, errors, redirects) are not what the url stands for
+                if page_url is not None and page_url == self._page_future_url:
+                    page = CachedPage(page_url, html, breadcrumbs, display_list)
+                    self._page_cache.put(page)
+                    self._save_snapshot(page)
 
             self._page_future = None
 
+        remaining_section_futures = {}
+        for section_id, fut in self._section_futures.items():
+            if fut.done():
+                try:
+                    display_list = fut.result()
+                except Exception as exc:
+                    display_list = parse_html(
+                        "<pre>%s</pre>" % "".join(traceback.format_exception(type(exc), exc, exc.__traceback__)))
+                self._html_widget.set_section_display_list(section_id, display_list)
+            else:
+                remaining_section_futures[section_id] = fut
+        self._section_futures = remaining_section_futures
+
+        if self._reload_urls and self._page_future is None:
+            reload_urls, self._reload_urls = self._reload_urls, set()
+            if self._current_url is not None and (None in reload_urls or self._current_url in reload_urls):
+                self._page_future = self._submit(self._load_page, self._current_url, FormData())
+                self._page_future_is_reload = True
+                self._page_future_url = self._current_url
+
         remaining_img_futures = {}
-        for url, fut in self._image_futures.items():
+        for key, fut in self._image_futures.items():
             if fut.done():
                 try:
-                    data = fut.result()
+                    decoded = fut.result()
                 except:
                     traceback.print_exc()
                 else:
-                    self._update_image(url, fut.result())
+                    self._update_image(key[0], key[1], decoded)
 
             else:
-                remaining_img_futures[url] = fut
+                remaining_img_futures[key] = fut
         self._image_futures = remaining_img_futures
-
-        self._poll_scheduler = self.after(200, self._poll_provider_responses)
+        self._dispatch_image_requests()
 
     def init_header(self, row, column):
         header_frame = ttk.Frame(self, style="ViewToolbar.TFrame")
         header_frame.grid(row=row, column=column, sticky="nsew")
-        header_frame.columnconfigure(0, weight=1)
+        header_frame.columnconfigure(2, weight=1)
+
+        self.back_button = ttk.Button(
+            header_frame, text=" ← ", style="ViewToolbar.Toolbutton", command=self.go_back, state="disabled"
+        )
+        self.back_button.grid(row=0, column=0, sticky="nw")
+        self.forward_button = ttk.Button(
+            header_frame, text=" → ", style="ViewToolbar.Toolbutton", command=self.go_forward, state="disabled"
+        )
+        self.forward_button.grid(row=0, column=1, sticky="nw")
 
         self.breadcrumbs_bar = BreadcrumbsBar(header_frame, self._on_request_new_page)
 
-        self.breadcrumbs_bar.grid(row=0, column=0, sticky="nsew")
+        self.breadcrumbs_bar.grid(row=0, column=2, sticky="nsew")
 
         # self.menu_button = ttk.Button(header_frame, text="≡ ", style="ViewToolbar.Toolbutton")
         self.menu_button = ttk.Button(
@@ -134,16 +287,69 @@ class ExercisesView(ttk.Frame):
         else:
             get_workbench().open_url(target)
 
-    def _on_request_image(self, url):
+    def _on_request_image(self, url, max_width):
         assert url is not None
 
-        if url not in self._image_futures:
-            self._image_futures[url] = self._executor.submit(self._provider.get_image, url)
+        key = (url, max_width)
+        if key in self._image_futures or key in self._pending_image_requests:
+            return
+
+        self._pending_image_requests[key] = None
+        # Dispatch after the current render slice, when the positions of the images are known
+        if self._image_dispatch_job is None:
+            self._image_dispatch_job = self.after_idle(self._dispatch_image_requests)
+
+    def _dispatch_image_requests(self):
+        if self._image_dispatch_job is not None:
+            self.after_cancel(self._image_dispatch_job)
+            self._image_dispatch_job = None
+
+        if self._provider is None:
+            # Images of the snapshot page wait for the provider
+            return
+
+        free_workers = MAX_RUNNING_IMAGE_REQUESTS - sum(1 for fut in self._image_futures.values() if not fut.done())
+        if free_workers <= 0 or not self._pending_image_requests:
+            return
+
+        chosen = []
+        for key in self._pending_image_requests:
+            if len(chosen) == free_workers:
+                break
+            if self._html_widget.is_image_visible(*key):
+                chosen.append(key)
+
+        for key in self._pending_image_requests:
+            if len(chosen) == free_workers:
+                break
+            if key not in chosen:
+                chosen.append(key)
+
+        for key in chosen:
+            del self._pending_image_requests[key]
+            self._image_futures[key] = self._submit(self._load_image, *key, executor=self._image_executor)
+
+    def _cancel_image_requests(self):
+        """Drops the requests of the previous page, which haven't reached a worker yet"""
+        self._pending_image_requests.clear()
+        if self._image_dispatch_job is not None:
+            self.after_cancel(self._image_dispatch_job)
+            self._image_dispatch_job = None
+        for key, fut in list(self._image_futures.items()):
+            if fut.cancel():
+                del self._image_futures[key]
+
+    def request_reload(self, url: Optional[str] = None):
+        """
+        Can be called from any thread when the provider has fresher data for the page at url or for any page.
+        If that page is shown, it is fetched again in the background and replaced only if it changed.
+        """
+        self._ui_queue.call_soon(self._reload_urls.add, url)
 
     def post_button_menu(self):
         self._button_menu.delete(0, "end")
 
-        items = self._provider.get_menu_items()
+        items = self._provider.get_menu_items() if self._provider is not None else None
         if not items:
             return
 
@@ -164,58 +370,216 @@ class ExercisesView(ttk.Frame):
             self.menu_button.winfo_rooty() + self.menu_button.winfo_height(),
         )
 
+    def clear_page_cache(self):
+        """Can be called from any thread, e.g. when the user changes"""
+        self._ui_queue.call_soon(self._clear_page_cache)
+
+    def _clear_page_cache(self):
+        self._page_cache.clear()
+        if self._snapshot_path is not None:
+            self._snapshot_key = None
+            remove_page_snapshot(self._snapshot_path)
+
+    def _save_snapshot(self, page: CachedPage):
+        if self._snapshot_path is None or (page.url, page.html) == self._snapshot_key:
+            return
+
+        self._snapshot_key = (page.url, page.html)
+        # Not waited for
+        self._executor.submit(save_page_snapshot, self._snapshot_path, page)
+
     def go_to(self, url, form_data=None):
         if form_data is None:
             form_data = FormData()
 
         assert url.startswith("/")
+        if self._provider is None:
+            # E.g. a link in the snapshot page. Loaded when the provider is ready.
+            self._start_url = url
+            self._start_form_data = form_data
+            if url != self._current_url or form_data:
+                self._current_url = None
+                self._set_page(WAITING_HTML, parse_html(WAITING_HTML))
+            return
+
+        self._remember_scroll_position()
+        self._history.visit(url)
+        self._load(url, form_data)
+
+    def go_back(self):
+        if self._history.can_go_back():
+            self._remember_scroll_position()
+            entry = self._history.back()
+            self._load(entry.url, FormData(), entry.yview)
+
+    def go_forward(self):
+        if self._history.can_go_forward():
+            self._remember_scroll_position()
+            entry = self._history.forward()
+            self._load(entry.url, FormData(), entry.yview)
+
+    def _load(self, url, form_data, yview=None):
         if self._page_future is not None:
             self._page_future.cancel()
+        self._cancel_prefetching()
+
+        # Form submissions are never answered from the cache
+        page_url = None if form_data else self._provider.get_canonical_url(url)
+        cached_page = None if page_url is None else self._page_cache.get(page_url)
+
+        self._page_future = self._submit(self._load_page, url, form_data)
+        self._page_future_url = page_url
+        self._reload_urls.clear()
+
+        if cached_page is not None:
+            # The result of the request only replaces the cached page if it differs
+            self._page_future_is_reload = True
+            self._current_url = cached_page.url
+            if cached_page.html != self._current_html:
+                self._set_page(cached_page.html, cached_page.display_list, yview)
+            else:
+                # Already shown, e.g. the snapshot page when the provider gets ready, or opened again through
+                # a link in it. Keeps the scroll position, but its sections may have changed.
+                if yview is not None:
+                    self._html_widget.yview_moveto(yview[0])
+                if self._deferred_sections_waiting or self._html_widget.get_deferred_sections():
+                    self._load_deferred_sections()
+            self.breadcrumbs_bar.set_links(cached_page.breadcrumbs)
+            self._prefetch_for_page(cached_page.url)
+        else:
+            self._page_future_is_reload = False
+            self._pending_yview = yview
+            self._set_page(WAITING_HTML, parse_html(WAITING_HTML))
 
-        self._page_future = self._executor.submit(
-            self._provider.get_html_and_breadcrumbs, url, form_data)
-        self._set_page_html("<p>⌛...</p>")
+        self._update_nav_buttons()
 
-    def _set_page_html(self, html):
-        self._html_widget.set_html_content(html)
+    def _on_link_hover(self, target):
+        if self._hover_prefetch_job is not None:
+            self.after_cancel(self._hover_prefetch_job)
+            self._hover_prefetch_job = None
 
-    def _make_tk_image(self, data):
-        try:
-            from PIL import Image
-            from PIL.ImageTk import PhotoImage
-            with BytesIO(data) as fp:
-                fp.seek(0)
-                pil_img = Image.open(fp)
-
-                # Resize while keeping the aspect ratio
-                basewidth = 250
-                wpercent = (basewidth / float(pil_img.size[0]))
-                hsize = int((float(pil_img.size[1]) * float(wpercent)))
-                return PhotoImage(pil_img.resize((basewidth, hsize), Image.ANTIALIAS))
-
-        except ImportError:
-            return tk.PhotoImage(data=data)
-
-    def _update_image(self, url, data):
+        if target is not None and target.startswith("/"):
+            self._hover_prefetch_job = self.after(PREFETCH_HOVER_DELAY_MS, self._prefetch_hovered_link, target)
+
+    def _prefetch_hovered_link(self, target):
+        self._hover_prefetch_job = None
+        self._prefetch(target)
+
+    def _prefetch_for_page(self, url):
+        if self._provider is None:
+            return
+
+        for target in self._provider.get_prefetch_urls(url):
+            self._prefetch(target)
+
+    def _prefetch(self, url):
+        if self._provider is None:
+            return
+
+        self._prefetch_futures = {key: fut for key, fut in self._prefetch_futures.items() if not fut.done()}
+        if url == self._current_url or self._prefetch_budget <= 0 or url in self._prefetch_futures:
+            return
+
+        prefetched_at = self._prefetched_at.get(url)
+        if prefetched_at is not None and time.time() - prefetched_at < PREFETCH_REPEAT_SECONDS:
+            return
+
+        self._prefetch_budget -= 1
+        self._prefetched_at[url] = time.time()
+        self._prefetch_futures[url] = self._prefetch_executor.submit(self._provider.prefetch, url)
+        # Prefetching may start background work of the provider
+        self._ui_queue.track(self._prefetch_futures[url])
+
+    def _cancel_prefetching(self):
+        if self._hover_prefetch_job is not None:
+            self.after_cancel(self._hover_prefetch_job)
+            self._hover_prefetch_job = None
+
+        for url, fut in list(self._prefetch_futures.items()):
+            if fut.cancel():
+                # Didn't start, so it doesn't count
+                self._prefetch_budget += 1
+                self._prefetched_at.pop(url, None)
+        self._prefetch_futures = {}
+
+    def _remember_scroll_position(self):
+        entry = self._history.get_current()
+        # Don't overwrite it with the position in the loading indicator
+        if entry is not None and (self._page_future is None or self._page_future_is_reload):
+            entry.yview = self._html_widget.yview()
+
+    def _update_nav_buttons(self):
+        self.back_button.configure(state="normal" if self._history.can_go_back() else "disabled")
+        self.forward_button.configure(state="normal" if self._history.can_go_forward() else "disabled")
+
+    def _load_page(self, url, form_data):
+        """Runs in a worker thread. Parsing happens here, so that the UI thread only needs to apply the result"""
+        html, breadcrumbs = self._provider.get_html_and_breadcrumbs(url, form_data)
+        return html, breadcrumbs, parse_html(html)
+
+    def _load_section(self, url):
+        return parse_html(self._provider.get_section_html(url))
+
+    def _set_page(self, html, display_list, yview=None):
+        self._current_html = html
+        self._deferred_sections_waiting = False
+        self._cancel_image_requests()
+        logger.debug(f"Image cache: {_image_cache.get_stats()}")
+        # The renderer pins the variants the new page uses
+        _image_cache.set_pinned(self._html_widget, ())
+
+        for fut in self._section_futures.values():
+            fut.cancel()
+        self._section_futures = {}
+
+        def on_complete():
+            if yview is not None:
+                self._html_widget.yview_moveto(yview[0])
+
+            if self._executor is None:
+                # Sections of the snapshot page are loaded when the provider is ready
+                self._deferred_sections_waiting = True
+                return
+
+            self._load_deferred_sections()
+
+        self._html_widget.set_display_list(display_list, on_complete)
+
+    def _load_deferred_sections(self):
+        self._deferred_sections_waiting = False
+        for fut in self._section_futures.values():
+            fut.cancel()
+        self._section_futures = {
+            section_id: self._submit(self._load_section, url)
+            for section_id, url in self._html_widget.get_deferred_sections()
+        }
+
+    def _load_image(self, url, max_width):
+        """
+        Runs in a worker thread, leaving only the PhotoImage construction to the UI thread.
+        Other variants of the image are decoded from the same source, which providers are expected to cache.
+        """
+        return decode_image(self._provider.get_image(url), max_width)
+
+    def _update_image(self, url, max_width, decoded):
         try:
-            tk_img = self._make_tk_image(data)
+            tk_img = make_tk_image(decoded)
         except:
             traceback.print_exc()
             return
 
-        _images_by_urls[url] = tk_img
-        self._html_widget.update_image(url, tk_img)
+        _image_cache.put(url, max_width, tk_img)
+        self._html_widget.update_image(url, max_width, tk_img)
 
     def destroy(self):
-        if self._poll_scheduler is not None:
-            try:
-                self.after_cancel(self._poll_scheduler)
-                self._poll_scheduler = None
-            except:
-                pass
-
-        super(ExercisesView, self).destroy()
         self._destroyed = True
+        self._ui_queue.close()
+        self._cancel_prefetching()
+        self._cancel_image_requests()
+        self._prefetch_executor.shutdown(wait=False)
+        self._image_executor.shutdown(wait=False)
+        _image_cache.set_pinned(self._html_widget, ())
+        super(ExercisesView, self).destroy()
 
 
 class BreadcrumbsBar(tktextext.TweakableText):
@@ -316,14 +680,23 @@ class ExerciseHtmlRenderer(HtmlRenderer):
         else:
             return super(ExerciseHtmlRenderer, self)._expand_field_value(value_holder, attrs)
 
-    def _get_image(self, name):
+    def update_image_widths(self):
+        super(ExerciseHtmlRenderer, self).update_image_widths()
+        # Variants for the previous width become evictable
+        _image_cache.set_pinned(self.widget, self._images)
+
+    def _get_image(self, url, max_width, request=True):
+        # Kept in the cache while the page shows it, also when it arrives later
+        _image_cache.pin(self.widget, [(url, max_width)])
+
         # Previously seen images can be given synchronously
-        if name in _images_by_urls:
-            return _images_by_urls[name]
+        img = _image_cache.get(url, max_width)
+        if img is not None:
+            return img
 
-        if self._image_requester is not None:
+        if request and self._image_requester is not None:
             # others should be requested asynchronously
-            self._image_requester(name)
+            self._image_requester(url, max_width)
 
         return None
 
@@ -333,11 +706,46 @@ class ExerciseProvider:
         raise NotImplementedError()
 
     def get_image(self, url) -> bytes:
-        return urlopen(url).read()
+        return http_client.get(url)[2]
 
     def get_max_threads(self) -> int:
         return 10
 
+    def has_background_work(self) -> bool:
+        """
+        Called in UI thread. Whether background work started by the provider itself (e.g. refreshing its caches)
+        may still call request_reload or clear_page_cache of the view. The view polls for these calls meanwhile.
+        """
+        return False
+
+    def get_section_html(self, url: str) -> str:
+        """
+        Called in a background thread for the content of an element with id and data-load attributes, which is
+        loaded separately from its page. Unlike pages, sections should report errors within their content.
+        """
+        return self.get_html_and_breadcrumbs(url, FormData())[0]
+
+    def get_canonical_url(self, url: str) -> str:
+        """
+        Called in UI thread. Returns the url the page at url is shown under, i.e. the url of its last breadcrumb.
+        Pages are cached under it, so urls which are aliases of the same page must be mapped here.
+        """
+        return url
+
+    def prefetch(self, url: str) -> None:
+        """
+        Called in a background thread for a url the user is likely to open next, e.g. a link under the mouse.
+        Providers can use it for warming up their caches.
+        """
+        pass
+
+    def get_prefetch_urls(self, url: str) -> List[str]:
+        """
+        Called in UI thread after the page at url has been shown, so it must not block.
+        Returns urls worth prefetching even without the user hovering over them.
+        """
+        return []
+
     def get_menu_items(self) -> List[Tuple[str, Union[str, Callable, None]]]:
         """
         This will be called each time the user clicks on the menu button.
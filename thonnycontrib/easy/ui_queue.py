@@ -0,0 +1,81 @@
+import concurrent.futures
+import logging
+import threading
+from collections import deque
+from typing import Callable, Set
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_MS = 50
+
+
+class UiQueue:
+    """
+    Hands results of background work over to the UI thread without Tk calls from other threads.
+
+    Worker threads only put calls into a locked queue. The UI thread runs them and on_poll with after, but polls
+    only while a tracked future is running, calls are waiting or has_work says that more calls may come.
+    Nothing is scheduled while idle, so work which can put calls into the queue must show up in has_work.
+    """
+
+    def __init__(self, widget, on_poll: Callable[[], None], has_work: Callable[[], bool] = lambda: False,
+                 interval_ms: int = POLL_INTERVAL_MS):
+        self._widget = widget
+        self._on_poll = on_poll
+        self._has_work = has_work
+        self._interval_ms = interval_ms
+        self._calls = deque()
+        self._calls_lock = threading.Lock()
+        self._futures = set()  # type: Set[concurrent.futures.Future]
+        self._poll_job = None
+        self._closed = False
+
+    def call_soon(self, fn: Callable, *args) -> None:
+        """Can be called from any thread. fn is called in the UI thread at the next poll."""
+        with self._calls_lock:
+            self._calls.append((fn, args))
+
+    def track(self, future: concurrent.futures.Future) -> None:
+        """Called in UI thread. Keeps polling until the future is done and on_poll has seen it done."""
+        self._futures.add(future)
+        self.start()
+
+    def start(self) -> None:
+        """Called in UI thread. Polling stops by itself when there is nothing left to wait for."""
+        if self._poll_job is None and not self._closed:
+            self._poll_job = self._widget.after(self._interval_ms, self._poll)
+
+    def is_polling(self) -> bool:
+        return self._poll_job is not None
+
+    def close(self) -> None:
+        self._closed = True
+        if self._poll_job is not None:
+            self._widget.after_cancel(self._poll_job)
+            self._poll_job = None
+
+    def _poll(self):
+        self._poll_job = None
+        # Checked before processing, so that work completing meanwhile gets another poll
+        was_busy = self._is_busy()
+        try:
+            with self._calls_lock:
+                calls, self._calls = self._calls, deque()
+            for fn, args in calls:
+                try:
+                    fn(*args)
+                except Exception:
+                    logger.exception(f"Error in {fn} called from a background thread")
+
+            if not self._closed:
+                self._on_poll()
+        finally:
+            if was_busy or self._is_busy():
+                self.start()
+
+    def _is_busy(self) -> bool:
+        self._futures = {fut for fut in self._futures if not fut.done()}
+        with self._calls_lock:
+            if self._calls:
+                return True
+        return bool(self._futures) or self._has_work()
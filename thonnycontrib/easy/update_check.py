@@ -0,0 +1,118 @@
+import json
+import logging
+import os
+import threading
+import time
+from importlib import metadata
+from typing import Optional, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_NAME = "thonny-lahendus"
+PYPI_URL = "https://pypi.org/pypi/thonny-lahendus/json"
+PYPI_TIMEOUT_SECONDS = 5
+CHECK_EVERY_SECONDS = 10 * 60
+
+
+def _major(version: str) -> int:
+    return int(version.split(".")[0])
+
+
+class UpdateChecker:
+    """
+    Checks PyPI for a newer plug-in version in a background thread and persists the last result.
+
+    Callers only ever see the last known result, so page loads never wait on PyPI.
+    """
+
+    def __init__(self, state_path: str, on_update_required: Optional[Callable[[], None]] = None):
+        self._state_path = state_path
+        self._on_update_required = on_update_required
+        self._lock = threading.Lock()
+        self._check_running = False
+        self._installed_version = self._get_installed_version()
+        self._latest_version, self._checked_at = self._load_state()
+
+    def is_update_required(self) -> bool:
+        """Returns the last known result (False while unknown) and starts a new check when it's due"""
+        if self._checked_at is None or time.time() - self._checked_at >= CHECK_EVERY_SECONDS:
+            self._start_check()
+
+        return self._is_update_required()
+
+    def is_checking(self) -> bool:
+        """Whether a check is running, which may still call on_update_required"""
+        return self._check_running
+
+    def get_versions(self) -> Dict[str, Optional[str]]:
+        return {"current": self._installed_version, "latest": self._latest_version}
+
+    def _is_update_required(self) -> bool:
+        if self._installed_version is None or self._latest_version is None:
+            return False
+
+        try:
+            return _major(self._installed_version) < _major(self._latest_version)
+        except ValueError:
+            logger.exception(f"Could not compare plug-in versions {self.get_versions()}")
+            return False
+
+    def _start_check(self):
+        with self._lock:
+            if self._check_running:
+                return
+            self._check_running = True
+
+        threading.Thread(target=self._check, name="lahendus-update-check", daemon=True).start()
+
+    def _check(self):
+        try:
+            import requests
+
+            logger.info("Getting the latest plugin-in version info via pypi...")
+            resp = requests.get(PYPI_URL, timeout=PYPI_TIMEOUT_SECONDS)
+            resp.raise_for_status()
+            was_required = self._is_update_required()
+            self._latest_version = resp.json()["info"]["version"]
+            self._checked_at = time.time()
+            self._save_state()
+            logger.info(f"Plug-in version info: {self.get_versions()}")
+
+            if self._is_update_required() and not was_required and self._on_update_required is not None:
+                logger.info(f"Plug-in update required from user: {self.get_versions()}")
+                self._on_update_required()
+        except Exception as e:
+            logger.warning(f"Plug-in update check failed: {e!r}")
+            # Don't retry on every page load when PyPI is unreachable
+            self._checked_at = time.time()
+        finally:
+            with self._lock:
+                self._check_running = False
+
+    @staticmethod
+    def _get_installed_version() -> Optional[str]:
+        try:
+            return metadata.version(PACKAGE_NAME)
+        except metadata.PackageNotFoundError:
+            logger.warning(f"Could not find installed version of '{PACKAGE_NAME}'")
+            return None
+
+    def _load_state(self):
+        try:
+            with open(self._state_path, mode="r", encoding="UTF-8") as f:
+                state = json.load(f)
+            return state["latest"], state["checked_at"]
+        except FileNotFoundError:
+            return None, None
+        except (ValueError, KeyError, OSError) as e:
+            logger.warning(f"Ignoring unreadable update check state: {e!r}")
+            return None, None
+
+    def _save_state(self):
+        tmp_path = f"{self._state_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, mode="w", encoding="UTF-8") as f:
+                json.dump({"latest": self._latest_version, "checked_at": self._checked_at}, f)
+            os.replace(tmp_path, self._state_path)
+        except OSError as e:
+            logger.warning(f"Could not save update check state: {e!r}")
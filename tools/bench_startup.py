@@ -0,0 +1,69 @@
+"""
+Measures what the plug-in costs Thonny at startup, using python -X importtime in fresh interpreters.
+
+Importing thonnycontrib.easy (done by Thonny for every plug-in) must stay cheap. The provider module, with
+easy-py, requests and chevron, is imported in a worker thread when the view is first shown.
+
+Usage: python tools/bench_startup.py [--repeat N]
+Exits with status 1 when importing the plug-in pulls in any of the deferred modules.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Imported by Thonny itself before plug-ins are loaded, so they don't count
+THONNY_IMPORTS = "import thonny.tktextext, thonny.ui_utils, thonny.codeview, thonny.workbench"
+PLUGIN_MODULE = "thonnycontrib.easy"
+PROVIDER_MODULE = "thonnycontrib.easy.easy_provider"
+DEFERRED_MODULES = ["easy", "chevron", "requests", "PIL"]
+
+
+def measure_import(module, preloaded):
+    """Returns cumulative import time of module in microseconds and names of all modules it imported"""
+    code = f"{THONNY_IMPORTS}\nimport {preloaded}\n" if preloaded else f"{THONNY_IMPORTS}\n"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")])))
+
+    # Only imports after the marker belong to the measured module
+    code += f"import sys; print('-- measured --', file=sys.stderr, flush=True)\nimport {module}\n"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env, capture_output=True,
+                          text=True, check=True)
+
+    lines = proc.stderr.split("-- measured --", 1)[1].splitlines()
+    imported = {}
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imported[name.strip()] = int(cumulative)
+
+    return imported.get(module, 0), set(imported)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    plugin_times = []
+    provider_times = []
+    plugin_modules = set()
+    for _ in range(args.repeat):
+        plugin_time, modules = measure_import(PLUGIN_MODULE, None)
+        plugin_times.append(plugin_time)
+        plugin_modules |= modules
+        provider_times.append(measure_import(PROVIDER_MODULE, PLUGIN_MODULE)[0])
+
+    print(f"import {PLUGIN_MODULE}: {min(plugin_times) / 1000:.1f} ms (best of {args.repeat})")
+    print(f"import {PROVIDER_MODULE} (in the worker thread): {min(provider_times) / 1000:.1f} ms")
+
+    leaked = [name for name in DEFERRED_MODULES if name in plugin_modules]
+    if leaked:
+        print(f"Importing {PLUGIN_MODULE} also imports {', '.join(leaked)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Compares rendering with the cached template tokens against tokenizing the template file on every render,
+as the plug-in did before. Also checks that both give identical output.
+
+Usage: python tools/bench_templates.py [--number N]
+Exits with status 1 when the outputs differ.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import chevron  # noqa: E402
+
+from thonnycontrib.easy.templates_generator import TEMPLATES_DIR, render, _get_strings  # noqa: E402
+
+EXERCISE_DATA = {"effective_title": "Ülesanne <1>", "text_html": "<p>" + "tekst " * 400 + "</p>", "is_open": True,
+                 "not_open": False, "solution": "print('x < y')\n" * 20, "EDITOR_CONTENT_NAME": "$EDITOR_CONTENT",
+                 "course_id": 1, "exercise_id": 2, "assessment_url": None, "feedback_html": "<p>Tagasiside</p>",
+                 "provider_url": "https://lahendus.ut.ee"} | _get_strings("et")
+FEEDBACK_DATA = {"points": "90", "feedback_type": "", "feedback_auto": "✔: test\n" * 10, "assessing": False,
+                 "latest_feedback_teacher": "<br/>Tubli!"} | _get_strings("en")
+
+# Templates with the data of their main branches. The first of each template is timed.
+CASES = [
+    ("exercise.mustache", EXERCISE_DATA),
+    ("exercise.mustache", EXERCISE_DATA | {"is_open": False, "not_open": True, "solution": None,
+                                           "assessment_url": "/assessment", "feedback_html": None}),
+    ("feedback.mustache", FEEDBACK_DATA),
+    ("feedback.mustache", {key: None for key in FEEDBACK_DATA} | {"assessing": True}),
+    ("authenticate.mustache", {"from_url": "/student/courses", "button": "Logi sisse"}),
+    ("update_en.mustache", {"current": "9.0.0", "latest": "10.0.0"}),
+    ("update_et.mustache", {"current": "9.0.0", "latest": "10.0.0"}),
+]
+
+
+def render_from_file(template_name, data):
+    with open(os.path.join(TEMPLATES_DIR, template_name), encoding="UTF-8") as f:
+        return chevron.render(f, data)
+
+
+def best_microseconds(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=500, help="renders per measurement")
+    args = parser.parse_args()
+
+    different = [name for name, data in CASES if render(name, data) != render_from_file(name, data)]
+    for name in different:
+        print(f"{name}: output differs from tokenizing the file")
+
+    timed = set()
+    for name, data in CASES:
+        if name in timed:
+            continue
+        timed.add(name)
+        from_file = best_microseconds(lambda: render_from_file(name, data), args.number)
+        cached = best_microseconds(lambda: render(name, data), args.number)
+        print(f"{name}: {from_file:.0f} us -> {cached:.0f} us per render")
+
+    return 1 if different else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())